@@ -11,43 +11,31 @@ from __future__ import annotations
 import argparse
 import asyncio
 import logging
+import os
 import sys
-from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Allow imports from the examples dir for the shared CLI helpers
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "examples"))
+# (plain string join: no filesystem access before --help is handled)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
 
-from pycasperglow import CasperGlow, discover_glows
-from pycasperglow.protocol import parse_protobuf_fields
+from _cli import build_parser, compile_filters, matches_filter, scan_cache_ttl
+
+from pycasperglow.protocol import parse_protobuf_field_items
+
+if TYPE_CHECKING:
+    from pycasperglow import CasperGlow
 
 logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
 _LOGGER = logging.getLogger(__name__)
 
+# Keep listening this long after the state response for trailing notifications
+NOTIFICATION_DRAIN_TIMEOUT = 0.25
+
 
 def _build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(
-        description="Connect to a Casper Glow light and dump decoded notifications."
-    )
-    parser.add_argument(
-        "-t",
-        "--timeout",
-        type=float,
-        default=10.0,
-        help="BLE scan duration in seconds (default: 10)",
-    )
-    parser.add_argument(
-        "-n",
-        "--name",
-        type=str,
-        default=None,
-        help="Glob pattern to filter devices by name (e.g. 'Jar*')",
-    )
-    parser.add_argument(
-        "-a",
-        "--address",
-        type=str,
-        default=None,
-        help="Glob pattern to filter devices by BLE address (e.g. 'AA:BB:*')",
+    parser = build_parser(
+        "Connect to a Casper Glow light and dump decoded notifications."
     )
     parser.add_argument(
         "--action",
@@ -58,66 +46,58 @@ def _build_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def _dump_fields(data: bytes, label: str, indent: int = 0) -> None:
-    """Pretty-print protobuf-like fields from a raw payload."""
+def _format_fields(data: bytes, label: str, indent: int = 0) -> str:
+    """Pretty-print protobuf-like fields from a raw payload.
+
+    Returns the dump as one multi-line string so callers can emit it in a
+    single log record.
+    """
     prefix = "  " * indent
-    _LOGGER.info("%s%s raw hex: %s", prefix, label, data.hex())
-    fields = parse_protobuf_fields(data)
+    lines = [f"{prefix}{label} raw hex: {data.hex()}"]
+    # Cached: identical sub-messages are only decoded once per run
+    fields = parse_protobuf_field_items(data)
     if not fields:
-        _LOGGER.info("%s  (no parseable fields)", prefix)
-        return
-    for field_num in sorted(fields):
-        for val in fields[field_num]:
+        lines.append(f"{prefix}  (no parseable fields)")
+    for field_num, values in fields:
+        for val in values:
             if isinstance(val, int):
-                _LOGGER.info("%s  field %d (varint): %d", prefix, field_num, val)
-            else:
-                _LOGGER.info(
-                    "%s  field %d (bytes[%d]): %s",
-                    prefix,
-                    field_num,
-                    len(val),
-                    val.hex(),
-                )
-                # Recurse one level into length-delimited sub-messages
-                sub = parse_protobuf_fields(val)
-                if sub:
-                    for sf in sorted(sub):
-                        for sv in sub[sf]:
-                            if isinstance(sv, int):
-                                _LOGGER.info(
-                                    "%s    sub-field %d (varint): %d",
-                                    prefix,
-                                    sf,
-                                    sv,
-                                )
-                            else:
-                                _LOGGER.info(
-                                    "%s    sub-field %d (bytes[%d]): %s",
-                                    prefix,
-                                    sf,
-                                    len(sv),
-                                    sv.hex(),
-                                )
+                lines.append(f"{prefix}  field {field_num} (varint): {val}")
+                continue
+            lines.append(
+                f"{prefix}  field {field_num} (bytes[{len(val)}]): {val.hex()}"
+            )
+            # Recurse one level into length-delimited sub-messages
+            for sf, sub_values in parse_protobuf_field_items(val):
+                for sv in sub_values:
+                    if isinstance(sv, int):
+                        lines.append(f"{prefix}    sub-field {sf} (varint): {sv}")
+                    else:
+                        lines.append(
+                            f"{prefix}    sub-field {sf} (bytes[{len(sv)}]): {sv.hex()}"
+                        )
+    return "\n".join(lines)
 
 
 async def main() -> None:
     parser = _build_parser()
     args = parser.parse_args()
 
-    _LOGGER.info("Scanning for Casper Glow lights (%.0fs)...", args.timeout)
-    devices = [dev async for dev in discover_glows(timeout=args.timeout)]
+    name_match, address_match = compile_filters(args)
 
-    if not devices:
-        _LOGGER.info("No Casper Glow lights found.")
-        return
+    # Imported here so --help and argument errors don't load the BLE stack.
+    from pycasperglow import CasperGlow, discover_glows_cached
 
-    # Apply optional filters
-    from _cli import filter_devices
-
-    devices = filter_devices(devices, args)
+    _LOGGER.info("Scanning for Casper Glow lights (%.0fs)...", args.timeout)
+    devices = [
+        dev
+        async for dev in discover_glows_cached(
+            timeout=args.timeout, cache_ttl=scan_cache_ttl(args)
+        )
+        if matches_filter(dev, name_match, address_match)
+    ]
 
     if not devices:
-        _LOGGER.info("No devices matched the given filter(s).")
+        _LOGGER.info("No Casper Glow lights found.")
         return
 
     _LOGGER.info("Found %d light(s):", len(devices))
@@ -125,32 +105,47 @@ async def main() -> None:
         _LOGGER.info("  %s (%s)", dev.name, dev.address)
 
     for dev in devices:
-        glow = CasperGlow(dev)
         _LOGGER.info("Connecting to %s (%s)...", dev.name, dev.address)
-
-        if args.action != "none":
-            _LOGGER.info("Sending action: %s", args.action)
-            action_map = {
-                "on": glow.turn_on,
-                "off": glow.turn_off,
-                "pause": glow.pause,
-                "resume": glow.resume,
-            }
-            try:
-                await action_map[args.action]()
-                _LOGGER.info("Action sent successfully.")
-            except Exception:
-                _LOGGER.exception("Failed to send action to %s", dev.name)
-                continue
-
-        _LOGGER.info("Querying state...")
         try:
-            state = await glow.query_state()
-            _LOGGER.info("State result: %s", state)
-            if state.raw_state:
-                _dump_fields(state.raw_state, f"State notification [{dev.name}]")
+            async with CasperGlow(dev) as glow:
+                await _capture(glow, args.action)
+        except Exception:
+            _LOGGER.exception("Failed to connect to %s", dev.name)
+
+
+async def _capture(glow: CasperGlow, action: str) -> None:
+    """Send the optional action and dump the state over one connection."""
+    if action != "none":
+        _LOGGER.info("Sending action: %s", action)
+        action_map = {
+            "on": glow.turn_on,
+            "off": glow.turn_off,
+            "pause": glow.pause,
+            "resume": glow.resume,
+        }
+        try:
+            await action_map[action]()
+            _LOGGER.info("Action sent successfully.")
         except Exception:
-            _LOGGER.exception("Failed to query state from %s", dev.name)
+            _LOGGER.exception("Failed to send action to %s", glow.name)
+            return
+
+    _LOGGER.info("Querying state...")
+    try:
+        state = await glow.query_state(drain_timeout=NOTIFICATION_DRAIN_TIMEOUT)
+    except Exception:
+        _LOGGER.exception("Failed to query state from %s", glow.name)
+        return
+    if not _LOGGER.isEnabledFor(logging.INFO):
+        return
+    dump = (
+        "\n".join(
+            _format_fields(data, f"Notification {i} [{glow.name}]")
+            for i, data in enumerate(state.raw_notifications, start=1)
+        )
+        or "(no notifications received)"
+    )
+    _LOGGER.info("State result: %s\n%s", state, dump)
 
 
 if __name__ == "__main__":
@@ -3,12 +3,30 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import fnmatch
-from typing import TYPE_CHECKING
+import logging
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from bleak.backends.device import BLEDevice
 
+_LOGGER = logging.getLogger(__name__)
+
+# A compiled filter: returns a truthy value when the string matches.
+Matcher = Callable[[str], object]
+
+
+@dataclass(frozen=True)
+class DaemonDevice:
+    """A light known to a running ``pycasperglow-daemon``."""
+
+    address: str
+    name: str | None
+
 
 def build_parser(description: str) -> argparse.ArgumentParser:
     """Create an argument parser with common discovery/filter flags."""
@@ -18,7 +36,7 @@ def build_parser(description: str) -> argparse.ArgumentParser:
         "--timeout",
         type=float,
         default=10.0,
-        help="BLE scan duration in seconds (default: 10)",
+        help="stop scanning after this many seconds without a new device (default: 10)",
     )
     parser.add_argument(
         "-n",
@@ -34,28 +52,108 @@ def build_parser(description: str) -> argparse.ArgumentParser:
         default=None,
         help="Glob pattern to filter devices by BLE address (e.g. 'AA:BB:*')",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore recently discovered devices and always run a full scan",
+    )
     return parser
 
 
-def matches_filter(dev: BLEDevice, args: argparse.Namespace) -> bool:
-    """Return True if a single device matches the CLI filter flags.
+def scan_cache_ttl(args: argparse.Namespace) -> float:
+    """Return the discovery cache TTL to use for the parsed CLI flags."""
+    return 0.0 if args.no_cache else 60.0
 
-    When both --name and --address are given, the device must match both.
+
+def _compile_glob(pattern: str) -> Matcher:
+    """Compile a glob pattern into a case-insensitive matcher.
+
+    A plain ``PREFIX*`` pattern, the common case for both names and
+    addresses, becomes a compare against the start of the value; anything
+    else goes through :func:`fnmatch.translate`.  Case is folded here, once,
+    so matching a device does not allocate folded copies of its strings.
     """
-    if args.name is not None:
-        dev_name = (dev.name or "").lower()
-        if not fnmatch.fnmatch(dev_name, args.name.lower()):
-            return False
-    return args.address is None or fnmatch.fnmatch(
-        dev.address.upper(), args.address.upper()
-    )
+    prefix = pattern[:-1].lower()
+    if pattern.endswith("*") and not any(c in prefix for c in "*?["):
+        size = len(prefix)
+        return lambda value: value[:size].lower() == prefix
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
+def compile_filters(args: argparse.Namespace) -> tuple[Matcher | None, Matcher | None]:
+    """Compile the --name/--address glob patterns once.
+
+    Returns ``(name_match, address_match)``; either is None when the flag
+    was not given.  Both are case-insensitive.
+    """
+    name_match = _compile_glob(args.name) if args.name is not None else None
+    address_match = _compile_glob(args.address) if args.address is not None else None
+    return name_match, address_match
 
 
-def filter_devices(
-    devices: list[BLEDevice], args: argparse.Namespace
-) -> list[BLEDevice]:
-    """Filter discovered devices by name and/or address glob patterns.
+def matches_filter(
+    dev: BLEDevice | DaemonDevice,
+    name_match: Matcher | None,
+    address_match: Matcher | None,
+) -> bool:
+    """Return True if a single device matches the compiled filters.
 
-    When both --name and --address are given, a device must match both.
+    When both filters are given, the device must match both.
     """
-    return [dev for dev in devices if matches_filter(dev, args)]
+    if name_match is not None and not name_match(dev.name or ""):
+        return False
+    return address_match is None or bool(address_match(dev.address))
+
+
+async def query_daemon(command: dict[str, Any]) -> dict[str, Any] | None:
+    """Send *command* to a running ``pycasperglow-daemon``.
+
+    Returns None when no daemon is listening, so callers can fall back to
+    scanning and connecting themselves.
+    """
+    from pycasperglow.daemon import send_command
+
+    try:
+        return await send_command(command)
+    except (OSError, ValueError):
+        return None
+
+
+async def daemon_devices(
+    name_match: Matcher | None, address_match: Matcher | None
+) -> list[DaemonDevice] | None:
+    """Return the daemon's matching lights, or None if no daemon is running."""
+    reply = await query_daemon({"cmd": "discover"})
+    if reply is None:
+        return None
+    devices = [
+        DaemonDevice(address=entry["address"], name=entry["name"])
+        for entry in reply.get("devices", [])
+    ]
+    return [dev for dev in devices if matches_filter(dev, name_match, address_match)]
+
+
+async def run_via_daemon(
+    cmd: str, name_match: Matcher | None, address_match: Matcher | None
+) -> bool:
+    """Send *cmd* to every matching light through a running daemon.
+
+    Returns False when no daemon is running.
+    """
+    devices = await daemon_devices(name_match, address_match)
+    if devices is None:
+        return False
+    if not devices:
+        _LOGGER.info("No Casper Glow lights known to the daemon.")
+        return True
+
+    async def _send(dev: DaemonDevice) -> None:
+        reply = await query_daemon({"cmd": cmd, "address": dev.address})
+        if reply is not None and reply.get("ok"):
+            _LOGGER.info("  %s %s (%s): success.", cmd, dev.name, dev.address)
+        else:
+            error = reply.get("error") if reply is not None else "daemon went away"
+            _LOGGER.error("  %s %s (%s) failed: %s", cmd, dev.name, dev.address, error)
+
+    await asyncio.gather(*(_send(dev) for dev in devices))
+    return True
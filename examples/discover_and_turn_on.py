@@ -1,37 +1,68 @@
 #!/usr/bin/env python3
 """Discover Casper Glow lights and turn them on."""
 
+from __future__ import annotations
+
 import asyncio
 import logging
+from typing import TYPE_CHECKING
 
-from _cli import build_parser, matches_filter
+from _cli import (
+    build_parser,
+    compile_filters,
+    matches_filter,
+    run_via_daemon,
+    scan_cache_ttl,
+)
 
-from pycasperglow import CasperGlow, discover_glows
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
 
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger(__name__)
 
 
+async def _handle(dev: BLEDevice) -> None:
+    """Turn a single device on, logging the outcome."""
+    from pycasperglow import CasperGlow
+
+    glow = CasperGlow(dev)
+    _LOGGER.info("Turning on %s (%s)...", dev.name, dev.address)
+    try:
+        await glow.turn_on()
+        _LOGGER.info("  Success: %s", dev.address)
+    except Exception:
+        _LOGGER.exception("  Failed to turn on %s", dev.address)
+
+
 async def main() -> None:
     parser = build_parser("Discover Casper Glow lights and turn them on.")
     args = parser.parse_args()
+    name_match, address_match = compile_filters(args)
+
+    # A running pycasperglow-daemon already has a warm scanner and open
+    # connections; only scan here when there is none.
+    if await run_via_daemon("on", name_match, address_match):
+        return
+
+    # Imported here so --help and argument errors don't load the BLE stack.
+    from pycasperglow import discover_glows_cached
 
     _LOGGER.info("Scanning for Casper Glow lights (%.0fs)...", args.timeout)
-    found = 0
-    async for dev in discover_glows(timeout=args.timeout):
-        if not matches_filter(dev, args):
+    # Start each device's command as soon as it is discovered so BLE
+    # connects overlap with the remainder of the scan.
+    tasks: list[asyncio.Task[None]] = []
+    async for dev in discover_glows_cached(
+        timeout=args.timeout, cache_ttl=scan_cache_ttl(args)
+    ):
+        if not matches_filter(dev, name_match, address_match):
             continue
-        found += 1
-        glow = CasperGlow(dev)
-        _LOGGER.info("Turning on %s (%s)...", dev.name, dev.address)
-        try:
-            await glow.turn_on()
-            _LOGGER.info("  Success.")
-        except Exception:
-            _LOGGER.exception("  Failed to turn on %s", dev.address)
-
-    if not found:
+        tasks.append(asyncio.create_task(_handle(dev)))
+
+    if not tasks:
         _LOGGER.info("No Casper Glow lights found.")
+        return
+    await asyncio.gather(*tasks)
 
 
 if __name__ == "__main__":
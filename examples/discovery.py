@@ -1,17 +1,96 @@
 #!/usr/bin/env python3
 """Discover Casper Glow lights and print their details."""
 
+from __future__ import annotations
+
 import asyncio
 import logging
+from typing import TYPE_CHECKING
 
-from _cli import build_parser, matches_filter
+from _cli import (
+    DaemonDevice,
+    build_parser,
+    compile_filters,
+    daemon_devices,
+    matches_filter,
+    query_daemon,
+    scan_cache_ttl,
+)
 
-from pycasperglow import CasperGlow, discover_glows
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
 
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger(__name__)
 
 
+def _log_state(
+    address: str,
+    *,
+    is_on: object,
+    brightness: object,
+    battery: object,
+    is_charging: object,
+    is_paused: object,
+    dimming_minutes: object,
+) -> None:
+    """Log a device's state as a single multi-line record."""
+    _LOGGER.info(
+        "State for %s:\n  Power: %s\n  Brightness: %s\n  Battery: %s"
+        "\n  Charging: %s\n  Paused: %s\n  Dimming time: %s",
+        address,
+        _fmt(is_on, {True: "ON", False: "OFF"}),
+        _fmt(brightness),
+        _fmt(battery),
+        _fmt(is_charging, {True: "yes", False: "no"}),
+        _fmt(is_paused),
+        _fmt(dimming_minutes),
+    )
+
+
+async def _query(dev: BLEDevice) -> None:
+    """Query and log the state of a single device."""
+    from pycasperglow import CasperGlow
+
+    glow = CasperGlow(dev)
+    _LOGGER.info("Querying state for %s (%s)...", dev.name, dev.address)
+    try:
+        state = await glow.query_state()
+    except Exception:
+        _LOGGER.exception("  Failed to query state for %s", dev.address)
+        return
+    _log_state(
+        dev.address,
+        is_on=state.is_on,
+        brightness=state.brightness_level,
+        battery=state.battery_level,
+        is_charging=state.is_charging,
+        is_paused=state.is_paused,
+        dimming_minutes=state.dimming_time_minutes,
+    )
+
+
+async def _query_via_daemon(dev: DaemonDevice) -> None:
+    """Query and log the state of a single device through the daemon."""
+    _LOGGER.info("Querying state for %s (%s)...", dev.name, dev.address)
+    reply = await query_daemon({"cmd": "state", "address": dev.address})
+    if reply is None or not reply.get("ok"):
+        error = reply.get("error") if reply is not None else "daemon went away"
+        _LOGGER.error("  Failed to query state for %s: %s", dev.address, error)
+        return
+    state = reply["state"]
+    battery = state["battery_percentage"]
+    _log_state(
+        dev.address,
+        is_on=state["is_on"],
+        brightness=state["brightness_level"],
+        battery=None if battery is None else f"{battery}%",
+        is_charging=state["is_charging"],
+        is_paused=state["is_paused"],
+        dimming_minutes=state["dimming_time_minutes"],
+    )
+
+
 async def main() -> None:
     parser = build_parser("Discover Casper Glow lights and print their details.")
     parser.add_argument(
@@ -21,37 +100,41 @@ async def main() -> None:
         help="Query each discovered device for its current state",
     )
     args = parser.parse_args()
+    name_match, address_match = compile_filters(args)
+
+    # Prefer a running pycasperglow-daemon, which already has a warm scanner.
+    known = await daemon_devices(name_match, address_match)
+    if known is not None:
+        if not known:
+            _LOGGER.info("No Casper Glow lights known to the daemon.")
+        for known_dev in known:
+            _LOGGER.info("Found: %s (%s)", known_dev.name, known_dev.address)
+        if args.state:
+            await asyncio.gather(*(_query_via_daemon(d) for d in known))
+        return
+
+    # Imported here so --help and argument errors don't load the BLE stack.
+    from pycasperglow import discover_glows_cached
 
     _LOGGER.info("Scanning for Casper Glow lights (%.0fs)...", args.timeout)
     found = 0
-    async for dev in discover_glows(timeout=args.timeout):
-        if not matches_filter(dev, args):
+    # State queries start as soon as a device is seen so they overlap
+    # with the rest of the scan.
+    tasks: list[asyncio.Task[None]] = []
+    async for dev in discover_glows_cached(
+        timeout=args.timeout, cache_ttl=scan_cache_ttl(args)
+    ):
+        if not matches_filter(dev, name_match, address_match):
             continue
         found += 1
         _LOGGER.info("Found: %s (%s)", dev.name, dev.address)
 
         if args.state:
-            glow = CasperGlow(dev)
-            _LOGGER.info("Querying state for %s (%s)...", dev.name, dev.address)
-            try:
-                state = await glow.query_state()
-                _LOGGER.info(
-                    "  Power: %s",
-                    _fmt(state.is_on, {True: "ON", False: "OFF"}),
-                )
-                _LOGGER.info("  Brightness: %s", _fmt(state.brightness_level))
-                _LOGGER.info("  Battery: %s", _fmt(state.battery_level))
-                _LOGGER.info(
-                    "  Charging: %s",
-                    _fmt(state.is_charging, {True: "yes", False: "no"}),
-                )
-                _LOGGER.info("  Paused: %s", _fmt(state.is_paused))
-                _LOGGER.info("  Dimming time: %s", _fmt(state.dimming_time_minutes))
-            except Exception:
-                _LOGGER.exception("  Failed to query state for %s", dev.address)
+            tasks.append(asyncio.create_task(_query(dev)))
 
     if not found:
         _LOGGER.info("No Casper Glow lights found.")
+    await asyncio.gather(*tasks)
 
 
 def _fmt(
@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
-"""Test pause and resume on a Casper Glow light.
+"""Test pause and resume on Casper Glow lights.
 
-Turns the light on, waits, pauses the dimming sequence,
-waits, resumes it, then turns the light off.
+Turns the lights on, waits, pauses the dimming sequence,
+waits, resumes it, then turns the lights off.  Each step is
+sent to all matching lights concurrently.
 """
 
+from __future__ import annotations
+
 import asyncio
 import logging
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING
 
-from _cli import build_parser, matches_filter
+from _cli import build_parser, compile_filters, matches_filter, scan_cache_ttl
 
-from pycasperglow import CasperGlow, discover_glows
+if TYPE_CHECKING:
+    from pycasperglow import CasperGlow
 
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger(__name__)
@@ -18,41 +25,77 @@ _LOGGER = logging.getLogger(__name__)
 PAUSE_DELAY = 5.0
 
 
+async def _run_step(
+    glows: list[CasperGlow],
+    label: str,
+    action: Callable[[CasperGlow], Awaitable[object]],
+) -> list[CasperGlow]:
+    """Run *action* on every light concurrently; return the ones that succeeded."""
+    results = await asyncio.gather(
+        *(action(glow) for glow in glows), return_exceptions=True
+    )
+    succeeded: list[CasperGlow] = []
+    for glow, result in zip(glows, results, strict=True):
+        if isinstance(result, BaseException):
+            _LOGGER.error("  Failed to %s %s", label, glow.address, exc_info=result)
+        else:
+            succeeded.append(glow)
+    return succeeded
+
+
 async def main() -> None:
     parser = build_parser("Test pause and resume on a Casper Glow light.")
     args = parser.parse_args()
+    name_match, address_match = compile_filters(args)
+
+    # Imported here so --help and argument errors don't load the BLE stack.
+    from pycasperglow import CasperGlow, discover_glows_cached
 
     _LOGGER.info("Scanning for Casper Glow lights (%.0fs)...", args.timeout)
-    found = 0
-    async for dev in discover_glows(timeout=args.timeout):
-        if not matches_filter(dev, args):
+    glows: list[CasperGlow] = []
+    async for dev in discover_glows_cached(
+        timeout=args.timeout, cache_ttl=scan_cache_ttl(args)
+    ):
+        if not matches_filter(dev, name_match, address_match):
             continue
-        found += 1
-        glow = CasperGlow(dev)
         _LOGGER.info("Testing %s (%s)...", dev.name, dev.address)
-        try:
-            _LOGGER.info("  Turning on...")
-            await glow.turn_on()
-            _LOGGER.info("  On. Waiting %.0fs before pause...", PAUSE_DELAY)
-            await asyncio.sleep(PAUSE_DELAY)
-
-            _LOGGER.info("  Pausing...")
-            await glow.pause()
-            input("  Paused. Press Enter to resume...")
-
-            _LOGGER.info("  Resuming...")
-            await glow.resume()
-            _LOGGER.info("  Resumed. Waiting %.0fs before turn off...", PAUSE_DELAY)
-            await asyncio.sleep(PAUSE_DELAY)
-
-            _LOGGER.info("  Turning off...")
-            await glow.turn_off()
-            _LOGGER.info("  Off. Done.")
-        except Exception:
-            _LOGGER.exception("  Failed during test sequence for %s", dev.address)
-
-    if not found:
+        glows.append(CasperGlow(dev))
+
+    if not glows:
         _LOGGER.info("No Casper Glow lights found.")
+        return
+
+    # Every step runs on all lights at once; a light that fails a step is
+    # dropped from the rest of the sequence.  Each light keeps a single
+    # connection open for the whole sequence.
+    async with AsyncExitStack() as stack:
+        glows = await _run_step(glows, "connect to", stack.enter_async_context)
+        if not glows:
+            return
+
+        _LOGGER.info("  Turning on...")
+        glows = await _run_step(glows, "turn on", CasperGlow.turn_on)
+        if not glows:
+            return
+        _LOGGER.info("  On. Waiting %.0fs before pause...", PAUSE_DELAY)
+        await asyncio.sleep(PAUSE_DELAY)
+
+        _LOGGER.info("  Pausing...")
+        glows = await _run_step(glows, "pause", CasperGlow.pause)
+        if not glows:
+            return
+        input("  Paused. Press Enter to resume...")
+
+        _LOGGER.info("  Resuming...")
+        glows = await _run_step(glows, "resume", CasperGlow.resume)
+        if not glows:
+            return
+        _LOGGER.info("  Resumed. Waiting %.0fs before turn off...", PAUSE_DELAY)
+        await asyncio.sleep(PAUSE_DELAY)
+
+        _LOGGER.info("  Turning off...")
+        await _run_step(glows, "turn off", CasperGlow.turn_off)
+        _LOGGER.info("  Off. Done.")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,10 @@
 """pycasperglow - Async Python library for Casper Glow lights."""
 
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from .const import (
     BRIGHTNESS_LEVELS,
     DEVICE_NAME_PREFIX,
@@ -7,8 +12,6 @@ from .const import (
     GATT_SERVICE_UUID,
     MANUFACTURER_ID,
 )
-from .device import BatteryLevel, CasperGlow, GlowState
-from .discovery import discover_glows, is_casper_glow
 from .exceptions import (
     CasperGlowError,
     CommandError,
@@ -16,11 +19,28 @@ from .exceptions import (
     HandshakeTimeoutError,
 )
 
+if TYPE_CHECKING:
+    from .device import BatteryLevel, CasperGlow, CommandBatch, GlowState
+    from .discovery import discover_glows, discover_glows_cached, is_casper_glow
+
+# Names that pull in bleak are imported on first access (PEP 562) so that
+# importing the package, or a script's --help, does not pay for the BLE stack.
+_LAZY_IMPORTS: dict[str, str] = {
+    "BatteryLevel": ".device",
+    "CasperGlow": ".device",
+    "CommandBatch": ".device",
+    "GlowState": ".device",
+    "discover_glows": ".discovery",
+    "discover_glows_cached": ".discovery",
+    "is_casper_glow": ".discovery",
+}
+
 __all__ = [
     "BRIGHTNESS_LEVELS",
     "BatteryLevel",
     "CasperGlow",
     "CasperGlowError",
+    "CommandBatch",
     "CommandError",
     "ConnectionError",
     "DEVICE_NAME_PREFIX",
@@ -30,5 +50,19 @@ __all__ = [
     "HandshakeTimeoutError",
     "MANUFACTURER_ID",
     "discover_glows",
+    "discover_glows_cached",
     "is_casper_glow",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
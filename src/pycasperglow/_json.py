@@ -0,0 +1,28 @@
+"""JSON helpers for the scan cache and daemon, using orjson when installed."""
+
+from __future__ import annotations
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    import json
+
+    def dumps(obj: Any) -> bytes:
+        """Serialise *obj* to compact UTF-8 encoded JSON."""
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(data: bytes | str) -> Any:
+        """Deserialise JSON from *data*."""
+        return json.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """Serialise *obj* to compact UTF-8 encoded JSON."""
+        return orjson.dumps(obj)
+
+    def loads(data: bytes | str) -> Any:
+        """Deserialise JSON from *data*."""
+        return orjson.loads(data)
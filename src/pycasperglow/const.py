@@ -1,4 +1,8 @@
-"""BLE UUIDs and packet constants for Casper Glow."""
+"""BLE UUIDs and packet constants for Casper Glow.
+
+Packet constants are written as bytes literals rather than
+``bytes.fromhex()`` calls so they cost nothing to build at import time.
+"""
 
 # GATT service UUID — available after connection, NOT advertised in BLE scans.
 GATT_SERVICE_UUID = "9bb30001-fee9-4c24-8361-443b5b7c88f6"
@@ -10,18 +14,18 @@ DEVICE_NAME_PREFIX = "Jar"
 # BLE manufacturer ID used in advertisement data (0xFFFF = Bluetooth SIG reserved).
 MANUFACTURER_ID = 0xFFFF
 
-RECONNECT_PACKET = bytes.fromhex("080122026a00")
-READY_MARKER = bytes.fromhex("72020800")
+RECONNECT_PACKET = b"\x08\x01\x22\x02\x6a\x00"
+READY_MARKER = b"\x72\x02\x08\x00"
 
-ACTION_BODY_ON = bytes.fromhex("1a020802")
-ACTION_BODY_OFF = bytes.fromhex("1a020804")
+ACTION_BODY_ON = b"\x1a\x02\x08\x02"
+ACTION_BODY_OFF = b"\x1a\x02\x08\x04"
 
 # Pause / Resume
-ACTION_BODY_PAUSE = bytes.fromhex("1a020805")
-ACTION_BODY_RESUME = bytes.fromhex("1a020806")
+ACTION_BODY_PAUSE = b"\x1a\x02\x08\x05"
+ACTION_BODY_RESUME = b"\x1a\x02\x08\x06"
 
 # State query — asks the device to report its current state
-QUERY_STATE_BODY = bytes.fromhex("52020803")
+QUERY_STATE_BODY = b"\x52\x02\x08\x03"
 
 # Valid dimming times the iOS app allows (in minutes)
 DIMMING_TIME_MINUTES: tuple[int, ...] = (15, 30, 45, 60, 90)
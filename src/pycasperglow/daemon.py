@@ -0,0 +1,237 @@
+"""Background daemon that keeps a BLE scanner and device connections warm.
+
+Repeated CLI invocations otherwise pay for scanner start-up, a fresh scan
+and a BLE connect on every run.  The daemon scans continuously, keeps one
+connection per light open, and accepts newline-delimited JSON commands on
+a Unix socket:
+
+  {"cmd": "discover"}                      -> {"ok": true, "devices": [...]}
+  {"cmd": "on", "address": "AA:BB:..."}    -> {"ok": true}
+  {"cmd": "state", "address": "AA:BB:..."} -> {"ok": true, "state": {...}}
+
+Supported actions are ``on``, ``off``, ``pause``, ``resume`` and ``state``.
+Failures are reported as ``{"ok": false, "error": "..."}``.
+
+Standalone use only (not for HA).  Requires Unix domain socket support.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import stat
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any
+
+from bleak import BleakScanner
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+
+from . import _json
+from .device import CasperGlow, GlowState
+from .discovery import is_casper_glow
+
+_LOGGER = logging.getLogger(__name__)
+
+_ACTIONS: dict[str, Callable[[CasperGlow], Awaitable[None]]] = {
+    "on": CasperGlow.turn_on,
+    "off": CasperGlow.turn_off,
+    "pause": CasperGlow.pause,
+    "resume": CasperGlow.resume,
+}
+
+
+def default_socket_path() -> Path:
+    """Return the per-user daemon socket path.
+
+    Prefers ``$XDG_RUNTIME_DIR``, then a private directory under
+    ``$XDG_CACHE_HOME`` (default ``~/.cache``); never the shared temp
+    directory, where another local user could bind the name first.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "pycasperglow.sock"
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    cache_dir = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return cache_dir / "pycasperglow" / "daemon.sock"
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Unlink a socket left at *path* by an earlier daemon run.
+
+    Raises OSError rather than removing anything that is not a socket
+    owned by the current user.
+    """
+    try:
+        st = path.lstat()
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise OSError(f"Refusing to replace {path}: not a socket owned by this user")
+    path.unlink()
+
+
+def _state_to_dict(state: GlowState) -> dict[str, Any]:
+    """Return the JSON-serialisable parts of *state*."""
+    return {
+        "is_on": state.is_on,
+        "is_paused": state.is_paused,
+        "is_charging": state.is_charging,
+        "battery_percentage": (
+            state.battery_level.percentage if state.battery_level is not None else None
+        ),
+        "brightness_level": state.brightness_level,
+        "dimming_time_minutes": state.dimming_time_minutes,
+        "configured_dimming_time_minutes": state.configured_dimming_time_minutes,
+    }
+
+
+class GlowDaemon:
+    """Track advertising Glows and run commands over persistent connections."""
+
+    def __init__(self) -> None:
+        self._devices: dict[str, BLEDevice] = {}
+        self._glows: dict[str, CasperGlow] = {}
+        self._stack = AsyncExitStack()
+
+    def _on_detection(self, device: BLEDevice, adv: AdvertisementData) -> None:
+        if not is_casper_glow(device, adv):
+            return
+        self._devices[device.address] = device
+        glow = self._glows.get(device.address)
+        if glow is not None:
+            glow.set_ble_device(device)
+
+    async def _get_glow(self, address: str) -> CasperGlow:
+        """Return the connected client for *address*, connecting on first use."""
+        glow = self._glows.get(address)
+        if glow is not None:
+            return glow
+        device = self._devices.get(address)
+        if device is None:
+            raise LookupError(f"Device {address} has not been discovered")
+        glow = self._glows[address] = CasperGlow(device)
+        try:
+            await self._stack.enter_async_context(glow)
+        except BaseException:
+            del self._glows[address]
+            raise
+        return glow
+
+    async def handle_command(self, command: dict[str, Any]) -> dict[str, Any]:
+        """Run a single decoded command and return the reply."""
+        cmd = command.get("cmd")
+        if cmd == "discover":
+            return {
+                "ok": True,
+                "devices": [
+                    {"address": device.address, "name": device.name}
+                    for device in self._devices.values()
+                ],
+            }
+        if cmd != "state" and cmd not in _ACTIONS:
+            return {"ok": False, "error": f"Unknown command {cmd!r}"}
+        address = command.get("address")
+        if not isinstance(address, str):
+            return {"ok": False, "error": "Missing device address"}
+
+        try:
+            glow = await self._get_glow(address)
+            if cmd == "state":
+                return {"ok": True, "state": _state_to_dict(await glow.query_state())}
+            await _ACTIONS[cmd](glow)
+        except Exception as err:
+            _LOGGER.debug("Command %s for %s failed", cmd, address, exc_info=True)
+            return {"ok": False, "error": str(err) or type(err).__name__}
+        return {"ok": True}
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    command = _json.loads(line)
+                except ValueError:
+                    command = None
+                if isinstance(command, dict):
+                    reply = await self.handle_command(command)
+                else:
+                    reply = {"ok": False, "error": "Expected a JSON object"}
+                writer.write(_json.dumps(reply) + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+    async def serve(self, socket_path: Path) -> None:
+        """Scan and accept commands on *socket_path* until cancelled.
+
+        The socket is created with mode 0600, inside a 0700 directory when
+        the directory does not exist yet.
+        """
+        socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _remove_stale_socket(socket_path)
+        async with (
+            self._stack,
+            BleakScanner(detection_callback=self._on_detection, scanning_mode="active"),
+        ):
+            # Bind under a restrictive umask so the socket is never reachable
+            # by other users, not even before a chmod could run.
+            umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(
+                    self._handle_client, path=str(socket_path)
+                )
+            finally:
+                os.umask(umask)
+            try:
+                _LOGGER.info("Listening on %s", socket_path)
+                async with server:
+                    await server.serve_forever()
+            finally:
+                socket_path.unlink(missing_ok=True)
+
+
+async def serve(socket_path: Path | None = None) -> None:
+    """Run a :class:`GlowDaemon` on *socket_path* until cancelled."""
+    await GlowDaemon().serve(socket_path or default_socket_path())
+
+
+async def send_command(
+    command: dict[str, Any], socket_path: Path | None = None
+) -> dict[str, Any]:
+    """Send one command to a running daemon and return its reply.
+
+    Raises OSError if no daemon is listening on *socket_path*.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("Unix domain sockets are not supported on this platform")
+    reader, writer = await asyncio.open_unix_connection(
+        str(socket_path or default_socket_path())
+    )
+    try:
+        writer.write(_json.dumps(command) + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+        with contextlib.suppress(OSError):
+            await writer.wait_closed()
+    if not line:
+        raise OSError("Daemon closed the connection without replying")
+    reply: dict[str, Any] = _json.loads(line)
+    return reply
+
+
+def main() -> None:
+    """Entry point for the ``pycasperglow-daemon`` console script."""
+    logging.basicConfig(level=logging.INFO)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve())
@@ -3,17 +3,26 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import enum
 import logging
-from collections.abc import Callable
+import time
+from collections.abc import AsyncIterator, Callable
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, TypeVar
 
 from bleak import BleakClient
 from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
 from bleak_retry_connector import establish_connection
 
 from .const import (
+    ACTION_BODY_OFF,
+    ACTION_BODY_ON,
+    ACTION_BODY_PAUSE,
+    ACTION_BODY_RESUME,
+    BRIGHTNESS_LEVELS,
+    DIMMING_TIME_MINUTES,
     HANDSHAKE_TIMEOUT,
     QUERY_STATE_BODY,
     READ_CHAR_UUID,
@@ -21,11 +30,12 @@ from .const import (
     STATE_RESPONSE_TIMEOUT,
     WRITE_CHAR_UUID,
 )
-from .exceptions import CommandError, HandshakeTimeoutError
+from .exceptions import HandshakeTimeoutError
 from .protocol import (
+    action_packet_template,
     build_action_packet,
     build_brightness_body,
-    extract_token_from_notify,
+    extract_ready_token,
     parse_protobuf_fields,
     parse_state_response,
     payload_contains_ready_marker,
@@ -33,9 +43,25 @@ from .protocol import (
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 
 _BATTERY_PERCENTAGE: dict[int, int] = {3: 25, 4: 50, 5: 75, 6: 100}
 
+# (field-19 sub-fields, sub-field 7 inner fields) of a state notification
+_StateFields = tuple[dict[int, list[int | bytes]], dict[int, list[int | bytes]]]
+
+
+def _decode_state_fields(data: bytes) -> _StateFields | None:
+    """Decode the state sub-fields and the nested sub-field 7 message."""
+    state_fields = parse_state_response(data)
+    if state_fields is None:
+        return None
+    sf7 = state_fields.get(7)
+    if sf7 is not None and isinstance(sf7[0], bytes):
+        return state_fields, parse_protobuf_fields(sf7[0])
+    return state_fields, {}
+
 
 class BatteryLevel(enum.IntEnum):
     """Discrete battery level reported by the device.
@@ -63,19 +89,26 @@ class BatteryLevel(enum.IntEnum):
         return _BATTERY_PERCENTAGE[self.value]
 
     def __str__(self) -> str:
-        return f"{self.percentage}%"
+        return _BATTERY_STR[self]
 
     @classmethod
     def from_raw(cls, value: int) -> BatteryLevel | None:
         """Return the matching member, or None if the value is unrecognised."""
-        try:
-            return cls(value)
-        except ValueError:
+        member = _RAW_TO_BATTERY_LEVEL.get(value)
+        if member is None:
             _LOGGER.debug("Unrecognised battery level raw value: %d", value)
-            return None
+        return member
+
+
+_RAW_TO_BATTERY_LEVEL: dict[int, BatteryLevel] = {
+    member.value: member for member in BatteryLevel
+}
+_BATTERY_STR: dict[BatteryLevel, str] = {
+    member: f"{member.percentage}%" for member in BatteryLevel
+}
 
 
-@dataclass
+@dataclass(slots=True)
 class GlowState:
     """Represents the current state of a Casper Glow light."""
 
@@ -89,6 +122,7 @@ class GlowState:
     is_paused: bool | None = None
     is_charging: bool | None = None
     raw_state: bytes | None = None
+    raw_notifications: tuple[bytes, ...] = ()  # every notification of the last query
 
     @property
     def dimming_time_minutes(self) -> int | None:
@@ -98,19 +132,321 @@ class GlowState:
         return self.dimming_time_remaining_ms // 60_000
 
 
+_StateKey = tuple[
+    bool | None,
+    int | None,
+    BatteryLevel | None,
+    int | None,
+    int | None,
+    bool | None,
+    bool | None,
+]
+
+
+def _state_key(state: GlowState) -> _StateKey:
+    """Return the user-visible fields of *state*, for change detection."""
+    return (
+        state.is_on,
+        state.brightness_level,
+        state.battery_level,
+        state.dimming_time_remaining_ms,
+        state.configured_dimming_time_minutes,
+        state.is_paused,
+        state.is_charging,
+    )
+
+
+def _apply_power(state: GlowState, value: int) -> None:
+    # Sub-field 1: power/mode indicator (1 = on, 3 = off)
+    state.is_on = value == 1
+    if not state.is_on:
+        state.is_paused = False
+
+
+def _apply_remaining_ms(state: GlowState, value: int) -> None:
+    # Sub-field 2: remaining dimming time in milliseconds (counts down to 0)
+    state.dimming_time_remaining_ms = value
+
+
+def _apply_configured_ms(state: GlowState, value: int) -> None:
+    # Sub-field 3: configured total duration in milliseconds.
+    # Only update when non-zero — device reports 0 when off.
+    if value > 0:
+        state.configured_dimming_time_minutes = value // 60_000
+
+
+def _apply_paused(state: GlowState, value: int) -> None:
+    # Sub-field 4: paused indicator (0 = not paused, 1 = paused)
+    state.is_paused = value != 0
+
+
+def _apply_charging(state: GlowState, value: int) -> None:
+    # Sub-field 7, inner field 1: charging indicator (0 = not charging,
+    # ≥1 = charging; 3 observed in practice).
+    state.is_charging = value != 0
+
+
+def _apply_battery(state: GlowState, value: int) -> None:
+    # Sub-field 7, inner field 2: battery level enum (3=25%, 4=50%, 5=75%, 6=100%).
+    # Sub-field 8 is always 100 and is NOT the battery level.
+    state.battery_level = BatteryLevel.from_raw(value)
+
+
+# Varint sub-fields of the field-19 state response, by field number
+_STATE_FIELD_HANDLERS: dict[int, Callable[[GlowState, int], None]] = {
+    1: _apply_power,
+    2: _apply_remaining_ms,
+    3: _apply_configured_ms,
+    4: _apply_paused,
+}
+# Varint fields of the nested sub-field 7 message, by field number
+_BATTERY_FIELD_HANDLERS: dict[int, Callable[[GlowState, int], None]] = {
+    1: _apply_charging,
+    2: _apply_battery,
+}
+
+
+def _mark_on(state: GlowState) -> None:
+    state.is_on = True
+
+
+def _mark_off(state: GlowState) -> None:
+    state.is_on = False
+    state.dimming_time_remaining_ms = 0
+
+
+def _mark_paused(state: GlowState) -> None:
+    state.is_paused = True
+
+
+def _mark_resumed(state: GlowState) -> None:
+    state.is_paused = False
+
+
+def _brightness_command(
+    level: int, dimming_time_minutes: int
+) -> tuple[bytes, Callable[[GlowState], None]]:
+    """Validate and build a brightness body plus its cached-state update."""
+    if level not in BRIGHTNESS_LEVELS:
+        raise ValueError(
+            f"Invalid brightness {level}; must be one of {BRIGHTNESS_LEVELS}"
+        )
+    if dimming_time_minutes not in DIMMING_TIME_MINUTES:
+        raise ValueError(
+            f"Invalid dimming time {dimming_time_minutes};"
+            f" must be one of {DIMMING_TIME_MINUTES}"
+        )
+
+    def _update(state: GlowState) -> None:
+        state.brightness_level = level
+        state.configured_dimming_time_minutes = dimming_time_minutes
+
+    return build_brightness_body(level, dimming_time_minutes * 60_000), _update
+
+
+# Packet builders for the fixed action bodies; only the token varies
+_PACKET_TEMPLATES: dict[bytes, Callable[[int], bytes]] = {
+    body: action_packet_template(body)
+    for body in (
+        ACTION_BODY_ON,
+        ACTION_BODY_OFF,
+        ACTION_BODY_PAUSE,
+        ACTION_BODY_RESUME,
+        QUERY_STATE_BODY,
+    )
+}
+
+
+def _action_packet(token: int, action_body: bytes) -> bytes:
+    template = _PACKET_TEMPLATES.get(action_body)
+    if template is None:
+        return build_action_packet(token, action_body)
+    return template(token)
+
+
+class CommandBatch:
+    """Commands queued inside :meth:`CasperGlow.batch`.
+
+    Each method only records the command; it is sent when the batch exits.
+    """
+
+    __slots__ = ("_bodies", "_updates")
+
+    def __init__(self) -> None:
+        self._bodies: list[bytes] = []
+        self._updates: list[Callable[[GlowState], None]] = []
+
+    def _add(self, action_body: bytes, update: Callable[[GlowState], None]) -> None:
+        self._bodies.append(action_body)
+        self._updates.append(update)
+
+    def turn_on(self) -> None:
+        """Queue turning the light on."""
+        self._add(ACTION_BODY_ON, _mark_on)
+
+    def turn_off(self) -> None:
+        """Queue turning the light off."""
+        self._add(ACTION_BODY_OFF, _mark_off)
+
+    def pause(self) -> None:
+        """Queue pausing the active dimming sequence."""
+        self._add(ACTION_BODY_PAUSE, _mark_paused)
+
+    def resume(self) -> None:
+        """Queue resuming a paused dimming sequence."""
+        self._add(ACTION_BODY_RESUME, _mark_resumed)
+
+    def set_brightness_and_dimming_time(
+        self, level: int, dimming_time_minutes: int
+    ) -> None:
+        """Queue a brightness/dimming change; raises ValueError immediately."""
+        self._add(*_brightness_command(level, dimming_time_minutes))
+
+
+class _NotifyHandler:
+    """Notify callback for a single command or state-query exchange.
+
+    Futures are single-shot: only the first ready marker resolves
+    ``token`` and only the first state response resolves ``state``.
+    If *notifications* is given, every payload is also queued on it.
+
+    The callback itself only copies the payload and checks for the
+    session token, which the handshake is waiting on; state decoding is
+    deferred to the next loop iteration with ``call_soon`` so the BLE
+    backend gets control back as quickly as possible.
+    """
+
+    __slots__ = ("_glow", "_loop", "notifications", "state", "token")
+
+    def __init__(
+        self, glow: CasperGlow, notifications: asyncio.Queue[bytes] | None = None
+    ) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._glow = glow
+        self.notifications = notifications
+        self.token: asyncio.Future[int] = self._loop.create_future()
+        self.state: asyncio.Future[None] = self._loop.create_future()
+
+    def __call__(self, _sender: Any, data: bytearray) -> None:
+        payload = bytes(data)  # one copy, shared by every consumer
+        if not self.token.done():
+            token = extract_ready_token(payload)
+            if token is not None:
+                self.token.set_result(token)
+        if self.notifications is not None:
+            self.notifications.put_nowait(payload)
+        self._loop.call_soon(self._apply_state, payload)
+
+    def _apply_state(self, payload: bytes) -> None:
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Notification: %s", payload.hex())
+        if self._glow._parse_state_notification(payload) and not self.state.done():
+            self.state.set_result(None)
+
+
 class CasperGlow:
-    """Async client for a Casper Glow light."""
+    """Async client for a Casper Glow light.
+
+    By default every command connects and disconnects.  With a positive
+    *idle_timeout*, the connection a command opened is kept for that many
+    seconds and reused by the next command; call :meth:`disconnect` to
+    close it early.  *handshake_timeout* bounds the wait for the device's
+    ready notification after each reconnect packet.
+
+    With a positive *session_token_ttl*, commands on a connection this
+    client opened itself (``async with glow:`` or one kept open while
+    idle) reuse the session token from a handshake in the last that many
+    seconds instead of handshaking again.  The device does not
+    acknowledge action packets, so a command sent with a token it no
+    longer accepts is dropped silently and the cached state is then
+    wrong; reuse is off by default and never applies to an external
+    client, whose connection the library cannot see being replaced.
+    """
+
+    # __dict__ stays so callers (and tests) can still patch attributes on an
+    # instance, e.g. ``patch.object(glow, "turn_on")``.
+    __slots__ = (
+        "__dict__",
+        "__weakref__",
+        "_ble_device",
+        "_ble_lock",
+        "_cached_token",
+        "_callbacks",
+        "_external_client",
+        "_handshake_timeout",
+        "_idle_client",
+        "_idle_close_task",
+        "_idle_handle",
+        "_idle_timeout",
+        "_last_fired",
+        "_last_notification",
+        "_last_state_fields",
+        "_session_client",
+        "_state",
+        "_token_client",
+        "_token_expires_at",
+        "_token_ttl",
+    )
 
     def __init__(
         self,
         ble_device: BLEDevice,
         client: BleakClient | None = None,
+        *,
+        idle_timeout: float = 0.0,
+        handshake_timeout: float = HANDSHAKE_TIMEOUT,
+        session_token_ttl: float = 0.0,
     ) -> None:
         self._ble_device = ble_device
         self._external_client = client
+        self._session_client: BleakClient | None = None
+        self._idle_timeout = idle_timeout
+        self._handshake_timeout = handshake_timeout
+        self._idle_client: BleakClient | None = None
+        self._idle_handle: asyncio.TimerHandle | None = None
+        self._idle_close_task: asyncio.Task[None] | None = None
         self._state = GlowState()
-        self._callbacks: list[Callable[[GlowState], None]] = []
+        self._callbacks: dict[object, Callable[[GlowState], None]] = {}
+        self._last_fired: _StateKey | None = None
         self._ble_lock = asyncio.Lock()
+        # Decoded form of the most recent notification; devices often repeat
+        # an identical state frame, which then skips the protobuf walk.
+        self._last_notification: bytes | None = None
+        self._last_state_fields: _StateFields | None = None
+        # Session token from the last handshake on a connection that stays open
+        self._token_ttl = session_token_ttl
+        self._cached_token: int | None = None
+        self._token_client: BleakClient | None = None
+        self._token_expires_at = 0.0
+
+    async def __aenter__(self) -> CasperGlow:
+        """Open a connection that every command reuses until the block exits.
+
+        Has no effect when an external client was supplied.
+        """
+        async with self._ble_lock:
+            if self._external_client is None and self._session_client is None:
+                self._session_client = (
+                    self._take_idle_client() or await self._establish_connection()
+                )
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Disconnect the connection opened by :meth:`__aenter__`."""
+        await self.disconnect()
+
+    async def disconnect(self) -> None:
+        """Close any connection this client opened and is keeping open.
+
+        An external client is never disconnected.
+        """
+        async with self._ble_lock:
+            client, self._session_client = self._session_client, None
+            idle_client = self._take_idle_client()
+            for owned in (client, idle_client):
+                if owned is not None:
+                    self._invalidate_token()
+                    await owned.disconnect()
 
     @property
     def name(self) -> str | None:
@@ -139,17 +475,33 @@ class CasperGlow:
     def register_callback(
         self, callback: Callable[[GlowState], None]
     ) -> Callable[[], None]:
-        """Register a callback for state updates. Returns an unregister function."""
-        self._callbacks.append(callback)
+        """Register a callback for state changes. Returns an unregister function.
+
+        Callbacks run after a command or :meth:`query_state` changes the
+        state; repeats of an unchanged state are skipped, except that the
+        first update after registering always fires.
+        """
+        # Keyed by a per-registration token: O(1) unregister, and the same
+        # callable may be registered more than once.
+        key = object()
+        self._callbacks[key] = callback
+        self._last_fired = None
 
         def _unregister() -> None:
-            self._callbacks.remove(callback)
+            self._callbacks.pop(key, None)
 
         return _unregister
 
     def _fire_callbacks(self) -> None:
         """Notify all registered callbacks of a state change."""
-        for callback in self._callbacks:
+        key = _state_key(self._state)
+        if key == self._last_fired:
+            return
+        # Recorded before the loop so a callback that triggers another
+        # update does not re-fire the same state.
+        self._last_fired = key
+        # Snapshot so a callback may unregister itself (or others) safely
+        for callback in tuple(self._callbacks.values()):
             callback(self._state)
 
     def _parse_state_notification(self, data: bytes) -> bool:
@@ -173,119 +525,99 @@ class CasperGlow:
             battery level enum (3=25%, 4=50%, 5=75%, 6=100%).
         * sub-field 8: always 100 in all captures — NOT the battery level.
         """
-        state_fields = parse_state_response(data)
-        if state_fields is None:
+        if data == self._last_notification:
+            decoded = self._last_state_fields
+        else:
+            decoded = _decode_state_fields(data)
+            self._last_notification = data
+            self._last_state_fields = decoded
+        if decoded is None:
             return False
+        state_fields, inner = decoded
 
         self._state.raw_state = data
 
-        # Sub-field 1: power/mode indicator (1 = on, 3 = off)
-        sf1 = state_fields.get(1)
-        if sf1 is not None and isinstance(sf1[0], int):
-            self._state.is_on = sf1[0] == 1
-            if not self._state.is_on:
-                self._state.is_paused = False
-
-        # Sub-field 2: remaining dimming time in milliseconds (counts down to 0)
-        sf2 = state_fields.get(2)
-        if sf2 is not None and isinstance(sf2[0], int):
-            self._state.dimming_time_remaining_ms = sf2[0]
-
-        # Sub-field 3: configured total duration in milliseconds.
-        # Only update when non-zero — device reports 0 when off.
-        sf3 = state_fields.get(3)
-        if sf3 is not None and isinstance(sf3[0], int):
-            total_ms = sf3[0]
-            if total_ms > 0:
-                self._state.configured_dimming_time_minutes = total_ms // 60_000
+        # One pass over the fields actually present; see _STATE_FIELD_HANDLERS.
+        # Protobuf encoders emit fields in ascending order, so sub-field 4
+        # (paused) is still applied after sub-field 1 (power).
+        state = self._state
+        for field_number, values in state_fields.items():
+            handler = _STATE_FIELD_HANDLERS.get(field_number)
+            if handler is not None and isinstance(values[0], int):
+                handler(state, values[0])
+        for field_number, values in inner.items():
+            handler = _BATTERY_FIELD_HANDLERS.get(field_number)
+            if handler is not None and isinstance(values[0], int):
+                handler(state, values[0])
 
         # Force remaining time to 0 when device is off regardless of what the
-        # device reported in sub-field 3.
-        if self._state.is_on is False:
-            self._state.dimming_time_remaining_ms = 0
-
-        # Sub-field 4: paused indicator (0 = not paused, 1 = paused)
-        sf4 = state_fields.get(4)
-        if sf4 is not None and isinstance(sf4[0], int):
-            self._state.is_paused = sf4[0] != 0
-
-        # Sub-field 7: nested message.
-        #   Inner field 1: charging indicator (0 = not charging, ≥1 = charging;
-        #     3 observed in practice).
-        #   Inner field 2: battery level enum (3=25%, 4=50%, 5=75%, 6=100%).
-        # Sub-field 8 is always 100 and is NOT the battery level.
-        sf7 = state_fields.get(7)
-        if sf7 is not None and isinstance(sf7[0], bytes):
-            inner = parse_protobuf_fields(sf7[0])
-            inner1 = inner.get(1)
-            if inner1 is not None and isinstance(inner1[0], int):
-                self._state.is_charging = inner1[0] != 0
-            inner2 = inner.get(2)
-            if inner2 is not None and isinstance(inner2[0], int):
-                self._state.battery_level = BatteryLevel.from_raw(inner2[0])
+        # device reported in sub-field 2.
+        if state.is_on is False:
+            state.dimming_time_remaining_ms = 0
 
         _LOGGER.debug("Parsed state from notification: %s", self._state)
         return True
 
+    def _reusable_token(self, client: BleakClient) -> int | None:
+        """Return the cached session token if it is still valid for *client*."""
+        if (
+            self._cached_token is None
+            or client is not self._token_client
+            or not client.is_connected
+            or time.monotonic() >= self._token_expires_at
+        ):
+            return None
+        return self._cached_token
+
+    def _cache_token(self, client: BleakClient, token: int) -> None:
+        self._cached_token = token
+        self._token_client = client
+        self._token_expires_at = time.monotonic() + self._token_ttl
+
+    def _invalidate_token(self) -> None:
+        self._cached_token = None
+        self._token_client = None
+
+    def _on_disconnected(self, client: BleakClient) -> None:
+        """Drop the session token when the connection it belongs to drops."""
+        if client is self._token_client:
+            self._invalidate_token()
+
     async def handshake(self) -> None:
         """Test connectivity by performing the handshake without sending a command.
 
         Raises HandshakeTimeoutError or ConnectionError on failure.
         """
-        ready_event = asyncio.Event()
+        ready: asyncio.Future[None] = asyncio.get_running_loop().create_future()
 
         def _on_notify(_sender: Any, data: bytearray) -> None:
-            if payload_contains_ready_marker(bytes(data)):
-                ready_event.set()
+            if not ready.done() and payload_contains_ready_marker(bytes(data)):
+                ready.set_result(None)
 
         client = await establish_connection(
             BleakClient, self._ble_device, self._ble_device.address
         )
         try:
             await client.start_notify(READ_CHAR_UUID, _on_notify)
-            await client.write_gatt_char(WRITE_CHAR_UUID, RECONNECT_PACKET)
-
-            try:
-                await asyncio.wait_for(ready_event.wait(), HANDSHAKE_TIMEOUT)
-            except TimeoutError as err:
-                raise HandshakeTimeoutError(
-                    f"Device did not become ready within {HANDSHAKE_TIMEOUT}s"
-                ) from err
+            await self._write_reconnect(client, ready)
         finally:
             await client.disconnect()
 
     async def turn_on(self) -> None:
         """Turn the light on."""
-        from .const import ACTION_BODY_ON
-
-        await self._execute_command(ACTION_BODY_ON)
-        self._state.is_on = True
-        self._fire_callbacks()
+        await self._send_command(ACTION_BODY_ON, _mark_on)
 
     async def turn_off(self) -> None:
         """Turn the light off."""
-        from .const import ACTION_BODY_OFF
-
-        await self._execute_command(ACTION_BODY_OFF)
-        self._state.is_on = False
-        self._state.dimming_time_remaining_ms = 0
-        self._fire_callbacks()
+        await self._send_command(ACTION_BODY_OFF, _mark_off)
 
     async def pause(self) -> None:
         """Pause an active dimming sequence."""
-        from .const import ACTION_BODY_PAUSE
-
-        await self._execute_command(ACTION_BODY_PAUSE)
-        self._state.is_paused = True
-        self._fire_callbacks()
+        await self._send_command(ACTION_BODY_PAUSE, _mark_paused)
 
     async def resume(self) -> None:
         """Resume a paused dimming sequence."""
-        from .const import ACTION_BODY_RESUME
-
-        await self._execute_command(ACTION_BODY_RESUME)
-        self._state.is_paused = False
-        self._fire_callbacks()
+        await self._send_command(ACTION_BODY_RESUME, _mark_resumed)
 
     async def set_brightness_and_dimming_time(
         self, level: int, dimming_time_minutes: int
@@ -299,121 +631,222 @@ class CasperGlow:
         Valid brightness values: 60, 70, 80, 90, 100 (iOS app levels 1–5).
         Valid dimming time values: 15, 30, 45, 60, 90 (minutes).
         """
-        from .const import BRIGHTNESS_LEVELS, DIMMING_TIME_MINUTES
+        await self._send_command(*_brightness_command(level, dimming_time_minutes))
 
-        if level not in BRIGHTNESS_LEVELS:
-            raise ValueError(
-                f"Invalid brightness {level}; must be one of {BRIGHTNESS_LEVELS}"
-            )
-        if dimming_time_minutes not in DIMMING_TIME_MINUTES:
-            raise ValueError(
-                f"Invalid dimming time {dimming_time_minutes};"
-                f" must be one of {DIMMING_TIME_MINUTES}"
-            )
-        body = build_brightness_body(level, dimming_time_minutes * 60_000)
-        await self._execute_command(body)
-        self._state.brightness_level = level
-        self._state.configured_dimming_time_minutes = dimming_time_minutes
+    async def _send_command(
+        self, action_body: bytes, update: Callable[[GlowState], None]
+    ) -> None:
+        await self._execute_command(action_body)
+        update(self._state)
         self._fire_callbacks()
 
-    async def _execute_command(self, action_body: bytes) -> None:
-        """Connect, handshake, send command, disconnect."""
-        async with self._ble_lock:
-            ready_event = asyncio.Event()
-            token: int | None = None
-
-            def _on_notify(_sender: Any, data: bytearray) -> None:
-                nonlocal token
-                _LOGGER.debug("Notification: %s", data.hex())
-                self._parse_state_notification(bytes(data))
-                if payload_contains_ready_marker(bytes(data)):
-                    extracted = extract_token_from_notify(bytes(data))
-                    if extracted is not None:
-                        token = extracted
-                        ready_event.set()
-
-            client = self._external_client or await establish_connection(
-                BleakClient, self._ble_device, self._ble_device.address
-            )
-            try:
-                if not client.is_connected:
-                    await client.connect()
+    @contextlib.asynccontextmanager
+    async def batch(self) -> AsyncIterator[CommandBatch]:
+        """Queue commands and send them after a single handshake.
 
-                await client.start_notify(READ_CHAR_UUID, _on_notify)
-                await client.write_gatt_char(WRITE_CHAR_UUID, RECONNECT_PACKET)
+        Usage::
 
-                try:
-                    await asyncio.wait_for(ready_event.wait(), HANDSHAKE_TIMEOUT)
-                except TimeoutError as err:
-                    raise HandshakeTimeoutError(
-                        f"Device did not become ready within {HANDSHAKE_TIMEOUT}s"
-                    ) from err
+            async with glow.batch() as batch:
+                batch.turn_on()
+                batch.set_brightness_and_dimming_time(80, 30)
 
-                if token is None:
-                    raise CommandError("Ready marker seen but no token extracted")
+        The queued packets are written in order when the block exits
+        normally; nothing is sent if it raises.  Cached state is updated
+        and callbacks fire once, after the last write.
+        """
+        batch = CommandBatch()
+        yield batch
+        if not batch._bodies:
+            return
+        await self._execute_command(*batch._bodies)
+        for update in batch._updates:
+            update(self._state)
+        self._fire_callbacks()
 
-                packet = build_action_packet(token, action_body)
-                await client.write_gatt_char(WRITE_CHAR_UUID, packet)
-                _LOGGER.debug("Sent action packet: %s", packet.hex())
+    async def _execute_command(self, *action_bodies: bytes) -> None:
+        """Connect, handshake, send each command, disconnect."""
+        async with self._ble_lock:
+            handler = _NotifyHandler(self)
+            client, shared = await self._connect()
+            try:
+                await client.start_notify(READ_CHAR_UUID, handler)
+
+                # On a connection this client opened and kept, skip the
+                # handshake while the previous token is fresh.  A BleakError
+                # means the write itself failed, so handshake and retry once;
+                # the device sends no acknowledgement either way.
+                cached_token = self._reusable_token(client)
+                if cached_token is not None:
+                    try:
+                        await self._write_actions(client, cached_token, action_bodies)
+                    except BleakError:
+                        _LOGGER.debug("Write with cached token failed; handshaking")
+                        self._invalidate_token()
+                    else:
+                        return
+
+                token = await self._handshake_token(client, handler.token, shared)
+                await self._write_actions(client, token, action_bodies)
             finally:
-                if self._external_client is None:
-                    await client.disconnect()
+                if not shared:
+                    await self._release(client)
 
-    async def query_state(self) -> GlowState:
+    async def query_state(self, drain_timeout: float = 0.0) -> GlowState:
         """Query the device for its current state.
 
         Connects, performs the handshake, sends a state query command,
         waits for the state response notification, and returns the
         updated GlowState.
+
+        Every notification received during the exchange is kept, in order,
+        in ``GlowState.raw_notifications``.  With a positive
+        *drain_timeout*, collection continues after the state response
+        until no notification has arrived for that many seconds, so a
+        burst the device sends after the response is not lost.
         """
         async with self._ble_lock:
-            ready_event = asyncio.Event()
-            state_event = asyncio.Event()
-            token: int | None = None
-
-            def _on_notify(_sender: Any, data: bytearray) -> None:
-                nonlocal token
-                _LOGGER.debug("Notification: %s", data.hex())
-                if self._parse_state_notification(bytes(data)):
-                    state_event.set()
-                if payload_contains_ready_marker(bytes(data)):
-                    extracted = extract_token_from_notify(bytes(data))
-                    if extracted is not None:
-                        token = extracted
-                        ready_event.set()
-
-            client = self._external_client or await establish_connection(
-                BleakClient, self._ble_device, self._ble_device.address
-            )
+            notifications: asyncio.Queue[bytes] = asyncio.Queue()
+            handler = _NotifyHandler(self, notifications)
+            client, shared = await self._connect()
             try:
-                if not client.is_connected:
-                    await client.connect()
-
-                await client.start_notify(READ_CHAR_UUID, _on_notify)
-                await client.write_gatt_char(WRITE_CHAR_UUID, RECONNECT_PACKET)
-
-                try:
-                    await asyncio.wait_for(ready_event.wait(), HANDSHAKE_TIMEOUT)
-                except TimeoutError as err:
-                    raise HandshakeTimeoutError(
-                        f"Device did not become ready within {HANDSHAKE_TIMEOUT}s"
-                    ) from err
+                await client.start_notify(READ_CHAR_UUID, handler)
+                token = await self._handshake_token(client, handler.token, shared)
 
-                if token is None:
-                    raise CommandError("Ready marker seen but no token extracted")
-
-                packet = build_action_packet(token, QUERY_STATE_BODY)
+                packet = _PACKET_TEMPLATES[QUERY_STATE_BODY](token)
                 await client.write_gatt_char(WRITE_CHAR_UUID, packet)
                 _LOGGER.debug("Sent state query: %s", packet.hex())
 
                 try:
-                    await asyncio.wait_for(state_event.wait(), STATE_RESPONSE_TIMEOUT)
+                    await asyncio.wait_for(handler.state, STATE_RESPONSE_TIMEOUT)
                 except TimeoutError:
                     _LOGGER.warning("State response timeout — returning cached state")
 
+                received: list[bytes] = []
+                while True:
+                    while not notifications.empty():
+                        received.append(notifications.get_nowait())
+                    if drain_timeout <= 0:
+                        break
+                    try:
+                        received.append(
+                            await asyncio.wait_for(notifications.get(), drain_timeout)
+                        )
+                    except TimeoutError:
+                        break
+                self._state.raw_notifications = tuple(received)
+
                 self._fire_callbacks()
             finally:
-                if self._external_client is None:
-                    await client.disconnect()
+                if not shared:
+                    await self._release(client)
 
             return self._state
+
+    async def _connect(self) -> tuple[BleakClient, bool]:
+        """Return a connected client and whether it outlives this exchange.
+
+        Shared clients (external, or opened by ``async with``) must not be
+        disconnected by the caller; a freshly established one must be.
+        """
+        shared_client = self._external_client or self._session_client
+        if shared_client is None:
+            client = self._take_idle_client() or await self._establish_connection()
+            return client, False
+        if not shared_client.is_connected:
+            # A new connection is a new session: the old token is not valid
+            self._invalidate_token()
+            await shared_client.connect()
+        return shared_client, True
+
+    async def _establish_connection(self) -> BleakClient:
+        """Open a connection owned by this client."""
+        return await establish_connection(
+            BleakClient,
+            self._ble_device,
+            self._ble_device.address,
+            disconnected_callback=self._on_disconnected,
+        )
+
+    async def _release(self, client: BleakClient) -> None:
+        """Disconnect a client from :meth:`_connect`, or keep it while idle."""
+        if self._idle_timeout > 0 and client.is_connected:
+            self._idle_client = client
+            self._idle_handle = asyncio.get_running_loop().call_later(
+                self._idle_timeout, self._on_idle_timeout
+            )
+            return
+        self._invalidate_token()
+        await client.disconnect()
+
+    def _take_idle_client(self) -> BleakClient | None:
+        """Claim the kept-open connection, if it is still connected."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        # The timer may already have fired with its close still waiting for
+        # the lock; it must not close the connection claimed here.
+        if self._idle_close_task is not None:
+            self._idle_close_task.cancel()
+            self._idle_close_task = None
+        client, self._idle_client = self._idle_client, None
+        if client is not None and not client.is_connected:
+            return None
+        return client
+
+    def _on_idle_timeout(self) -> None:
+        self._idle_handle = None
+        self._idle_close_task = asyncio.create_task(self._close_idle_client())
+
+    async def _close_idle_client(self) -> None:
+        async with self._ble_lock:
+            self._idle_close_task = None
+            client, self._idle_client = self._idle_client, None
+            if client is not None:
+                _LOGGER.debug("Closing idle connection to %s", self.address)
+                self._invalidate_token()
+                await client.disconnect()
+
+    async def _write_reconnect(
+        self, client: BleakClient, ready: asyncio.Future[_T]
+    ) -> _T:
+        """Write the reconnect packet and wait for *ready* to resolve."""
+        await client.write_gatt_char(WRITE_CHAR_UUID, RECONNECT_PACKET)
+        # The ready notification often arrives before the write returns;
+        # skip wait_for's timeout handle when it already has.
+        if ready.done():
+            return ready.result()
+        try:
+            return await asyncio.wait_for(ready, self._handshake_timeout)
+        except TimeoutError as err:
+            raise HandshakeTimeoutError(
+                f"Device did not become ready within {self._handshake_timeout}s"
+            ) from err
+
+    async def _handshake_token(
+        self, client: BleakClient, token_future: asyncio.Future[int], shared: bool
+    ) -> int:
+        """Handshake and return the session token.
+
+        With token reuse enabled, the token is cached when this client
+        opened the connection and it outlives this exchange: the
+        ``async with`` session client, or one kept open while idle.
+        """
+        token = await self._write_reconnect(client, token_future)
+        if (
+            self._token_ttl > 0
+            and client is not self._external_client
+            and (shared or self._idle_timeout > 0)
+        ):
+            self._cache_token(client, token)
+        return token
+
+    async def _write_actions(
+        self, client: BleakClient, token: int, action_bodies: tuple[bytes, ...]
+    ) -> None:
+        for action_body in action_bodies:
+            packet = _action_packet(token, action_body)
+            await client.write_gatt_char(WRITE_CHAR_UUID, packet)
+            _LOGGER.debug("Sent action packet: %s", packet.hex())
+        # Let state notifications deferred by _NotifyHandler during these
+        # writes apply now, before the caller's optimistic update.
+        await asyncio.sleep(0)
@@ -3,37 +3,60 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+import os
+import tempfile
+import time
 from collections.abc import AsyncIterator
+from pathlib import Path
 
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
-from .const import DEVICE_NAME_PREFIX, MANUFACTURER_ID
+from . import _json
+from .const import DEVICE_NAME_PREFIX
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def default_scan_cache_path() -> Path:
+    """Return the per-user scan cache path.
+
+    Prefers ``$XDG_RUNTIME_DIR``, then ``$XDG_CACHE_HOME`` (default
+    ``~/.cache``); never the shared temp directory, where another local
+    user could plant the file.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "pycasperglow_scan.json"
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    cache_dir = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return cache_dir / "pycasperglow" / "scan.json"
 
 
 def is_casper_glow(device: BLEDevice, adv: AdvertisementData) -> bool:
     """Return True if the device appears to be a Casper Glow.
 
     Casper Glow lights do not advertise a service UUID.  Detection relies
-    on the local name prefix ("Jar") and, as a secondary signal, the
-    manufacturer-specific data company ID (0xFFFF).
+    on the local name prefix ("Jar"), falling back to the device name when
+    the advertisement carries no local name.  The manufacturer-data company
+    ID (0xFFFF, ``MANUFACTURER_ID``) is shared with many unregistered
+    devices, so it cannot identify a Glow on its own.
     """
-    name = adv.local_name or device.name or ""
-    if name.startswith(DEVICE_NAME_PREFIX):
-        return True
-    # Fallback: manufacturer data with the known company ID + name present
-    if MANUFACTURER_ID in adv.manufacturer_data and name:
-        return name.startswith(DEVICE_NAME_PREFIX)
-    return False
+    # Called for every advertisement during a scan: one attribute chain
+    # and one prefix test, no allocation.
+    name = adv.local_name or device.name
+    return name is not None and name.startswith(DEVICE_NAME_PREFIX)
 
 
 async def discover_glows(timeout: float = 10.0) -> AsyncIterator[BLEDevice]:
     """Scan for Casper Glow devices, yielding each as it is found.
 
     Devices are yielded immediately on detection rather than waiting for
-    the full *timeout* to elapse.  The scan stops once *timeout* seconds
-    have passed with no new device discovered.
+    the full *timeout* to elapse, so callers can start connecting to one
+    device while the scan continues looking for others.  The scan stops
+    once *timeout* seconds have passed with no new device discovered.
 
     Standalone use only (not for HA).
     """
@@ -45,18 +68,167 @@ async def discover_glows(timeout: float = 10.0) -> AsyncIterator[BLEDevice]:
             seen.add(device.address)
             queue.put_nowait(device)
 
-    scanner = BleakScanner(detection_callback=_on_detection)
-    await scanner.start()
-    try:
-        deadline = asyncio.get_event_loop().time() + timeout
+    # Active scanning requests scan responses, which is where the "Jar"
+    # local name usually arrives, and maps to LOW_LATENCY on Android.  No
+    # service UUID filter is applied because the Glow does not advertise one.
+    async with BleakScanner(detection_callback=_on_detection, scanning_mode="active"):
+        now = asyncio.get_running_loop().time
+        deadline = now() + timeout
         while True:
-            remaining = deadline - asyncio.get_event_loop().time()
-            if remaining <= 0:
-                break
+            # Drain devices that are already queued without touching the clock
             try:
-                device = await asyncio.wait_for(queue.get(), timeout=remaining)
-                yield device
-            except TimeoutError:
-                break
-    finally:
-        await scanner.stop()
+                device = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - now()
+                if remaining <= 0:
+                    break
+                try:
+                    device = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except TimeoutError:
+                    break
+            # Every new device restarts the quiet period
+            deadline = now() + timeout
+            yield device
+
+
+# (address, name, timestamp) of a device recorded in the scan cache
+_CacheEntry = tuple[str, str | None, float]
+
+
+def _load_scan_cache(path: Path, ttl: float) -> list[_CacheEntry]:
+    """Return ``(address, name, timestamp)`` entries younger than *ttl* seconds.
+
+    A missing, unreadable or malformed cache file is treated as empty.
+    """
+    if ttl <= 0:
+        return []
+    try:
+        raw = _json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return []
+    if not isinstance(raw, list):
+        return []
+    cutoff = time.time() - ttl
+    entries: list[_CacheEntry] = []
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        address = item.get("address")
+        name = item.get("name")
+        timestamp = item.get("timestamp")
+        if (
+            isinstance(address, str)
+            and (name is None or isinstance(name, str))
+            and isinstance(timestamp, int | float)
+            and timestamp >= cutoff
+        ):
+            entries.append((address, name, float(timestamp)))
+    return entries
+
+
+def _save_scan_cache(path: Path, entries: list[_CacheEntry]) -> None:
+    """Atomically replace the scan cache at *path* with *entries*."""
+    payload = _json.dumps(
+        [
+            {"address": address, "name": name, "timestamp": timestamp}
+            for address, name, timestamp in entries
+        ]
+    )
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Unpredictable name, created O_EXCL: nothing planted is followed
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+        )
+    except OSError as err:
+        _LOGGER.debug("Could not write scan cache %s: %s", path, err)
+        return
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(payload)
+        os.replace(tmp_name, path)
+    except OSError as err:
+        _LOGGER.debug("Could not write scan cache %s: %s", path, err)
+        Path(tmp_name).unlink(missing_ok=True)
+
+
+# Upper bound on the scan for cached addresses before a full scan runs
+_CACHED_LOOKUP_TIMEOUT = 3.0
+
+
+async def _find_cached_glows(
+    addresses: set[str], timeout: float
+) -> AsyncIterator[BLEDevice]:
+    """Yield the devices at *addresses* that still advertise as a Glow.
+
+    The cache file is only trusted for addresses: each advertisement is
+    checked with :func:`is_casper_glow` again before the device is used.
+    A single scan looks for all of them, since many adapters allow only
+    one scan at a time; it stops once every address has been seen or
+    *timeout* seconds have passed.
+    """
+    queue: asyncio.Queue[BLEDevice] = asyncio.Queue()
+    pending = {address.lower() for address in addresses}
+
+    def _on_detection(device: BLEDevice, adv: AdvertisementData) -> None:
+        address = device.address.lower()
+        if address in pending and is_casper_glow(device, adv):
+            pending.discard(address)
+            queue.put_nowait(device)
+
+    async with BleakScanner(detection_callback=_on_detection, scanning_mode="active"):
+        now = asyncio.get_running_loop().time
+        deadline = now() + timeout
+        while pending or not queue.empty():
+            try:
+                device = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - now()
+                if remaining <= 0:
+                    break
+                try:
+                    device = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except TimeoutError:
+                    break
+            yield device
+
+
+async def discover_glows_cached(
+    timeout: float = 10.0,
+    cache_ttl: float = 60.0,
+    cache_path: Path | None = None,
+) -> AsyncIterator[BLEDevice]:
+    """Like :func:`discover_glows`, but reuse recent results from an on-disk cache.
+
+    Devices recorded within the last *cache_ttl* seconds are looked for
+    in one short scan and yielded as each is seen advertising as a Glow
+    again.  A full scan only runs when none of them is found.  Pass
+    ``cache_ttl=0`` to force a rescan while still refreshing the cache.
+
+    The cache is rewritten only when iteration runs to the end, so a
+    caller that stops early leaves it as it was.  It lives at
+    *cache_path*, by default :func:`default_scan_cache_path`.
+
+    Standalone use only (not for HA).
+    """
+    if cache_path is None:
+        cache_path = default_scan_cache_path()
+    cached = {
+        entry[0].lower(): entry for entry in _load_scan_cache(cache_path, cache_ttl)
+    }
+    if cached:
+        hits: list[_CacheEntry] = []
+        async for device in _find_cached_glows(
+            set(cached), min(timeout, _CACHED_LOOKUP_TIMEOUT)
+        ):
+            hits.append(cached[device.address.lower()])
+            yield device
+        if hits:
+            _save_scan_cache(cache_path, hits)
+            return
+
+    found: list[_CacheEntry] = []
+    async for device in discover_glows(timeout=timeout):
+        found.append((device.address, device.name, time.time()))
+        yield device
+    _save_scan_cache(cache_path, found)
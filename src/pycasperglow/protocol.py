@@ -6,11 +6,17 @@ notification field parsing, and action packet construction. No I/O.
 
 from __future__ import annotations
 
+import functools
+from collections.abc import Callable
+
 from .const import READY_MARKER
 
 # Protobuf field number for the state response sub-message
 STATE_RESPONSE_FIELD = 19
 
+# Encoded form of every single-byte varint (0-127)
+_SINGLE_BYTE_VARINTS: tuple[bytes, ...] = tuple(bytes((i,)) for i in range(0x80))
+
 
 def parse_varint(data: bytes, start: int = 0) -> tuple[int, int]:
     """Decode a protobuf varint from data starting at the given offset.
@@ -18,23 +24,60 @@ def parse_varint(data: bytes, start: int = 0) -> tuple[int, int]:
     Returns (value, next_offset).
     Raises ValueError if data is truncated.
     """
+    decoded = _try_parse_varint(data, start)
+    if decoded is None:
+        raise ValueError("Truncated varint")
+    return decoded
+
+
+def _try_parse_varint(data: bytes, start: int) -> tuple[int, int] | None:
+    """Like :func:`parse_varint`, but return None if data is truncated.
+
+    The parsers below use this so a truncated payload ends the parse
+    without raising and catching an exception per varint.
+    """
+    # Fast paths: tags and most values in Glow payloads fit in one byte;
+    # session tokens and the field-18 tag usually fit in two.
+    end = len(data)
+    if start < end and data[start] < 0x80:
+        return data[start], start + 1
+    if start + 1 < end and data[start + 1] < 0x80:
+        return (data[start] & 0x7F) | (data[start + 1] << 7), start + 2
     result = 0
     shift = 0
     pos = start
-    while pos < len(data):
+    while pos < end:
         byte = data[pos]
         result |= (byte & 0x7F) << shift
         pos += 1
         if not byte & 0x80:
             return result, pos
         shift += 7
-    raise ValueError("Truncated varint")
+    return None
 
 
 def encode_varint(value: int) -> bytes:
     """Encode an integer as a protobuf varint."""
-    if value < 0:
-        raise ValueError("Varint must be non-negative")
+    # Values up to 28 bits (every tag, length, level and dimming time, and
+    # typical session tokens) are written straight-line, one range check
+    # per size; single bytes come from a table.  Longer values loop.
+    if value < 0x80:
+        if value < 0:
+            raise ValueError("Varint must be non-negative")
+        return _SINGLE_BYTE_VARINTS[value]
+    if value < 0x4000:
+        return bytes(((value & 0x7F) | 0x80, value >> 7))
+    if value < 0x200000:
+        return bytes(((value & 0x7F) | 0x80, (value >> 7 & 0x7F) | 0x80, value >> 14))
+    if value < 0x10000000:
+        return bytes(
+            (
+                (value & 0x7F) | 0x80,
+                (value >> 7 & 0x7F) | 0x80,
+                (value >> 14 & 0x7F) | 0x80,
+                value >> 21,
+            )
+        )
     parts: list[int] = []
     while value > 0x7F:
         parts.append((value & 0x7F) | 0x80)
@@ -45,7 +88,10 @@ def encode_varint(value: int) -> bytes:
 
 def payload_contains_ready_marker(payload: bytes) -> bool:
     """Check if a notification payload contains the ready marker."""
-    return READY_MARKER in payload
+    # find() rather than ``in``: bytes.__contains__ first tries the
+    # operand as an int and discards the TypeError, which costs more
+    # than the search itself on payloads this short.
+    return payload.find(READY_MARKER) >= 0
 
 
 def extract_token_from_notify(payload: bytes) -> int | None:
@@ -55,34 +101,31 @@ def extract_token_from_notify(payload: bytes) -> int | None:
     is carried in field 1 (tag byte 0x08) as a varint, typically near the
     start of the payload. Returns None if no token field is found.
     """
-    pos = 0
-    while pos < len(payload):
-        try:
-            tag_byte, pos = parse_varint(payload, pos)
-        except ValueError:
-            return None
-        field_number = tag_byte >> 3
-        wire_type = tag_byte & 0x07
-
-        if wire_type == 0:  # varint
-            try:
-                value, pos = parse_varint(payload, pos)
-            except ValueError:
-                return None
-            if field_number == 1:
-                return value
-        elif wire_type == 2:  # length-delimited
-            try:
-                length, pos = parse_varint(payload, pos)
-            except ValueError:
-                return None
-            pos += length
-        else:
-            # Unknown wire type — can't continue safely
-            return None
+    if payload[:1] == b"\x08":
+        # Field 1 leads the payload: decode it without a full parse.  This is
+        # only a shortcut; nothing relies on the device sending field 1 first.
+        decoded = _try_parse_varint(payload, 1)
+        return None if decoded is None else decoded[0]
+    # Any other field order goes through the generic field parser
+    for value in parse_protobuf_fields(payload).get(1, ()):
+        if isinstance(value, int):
+            return value
     return None
 
 
+def extract_ready_token(payload: bytes) -> int | None:
+    """Return the session token if *payload* is a ready notification.
+
+    Combines :func:`payload_contains_ready_marker` and
+    :func:`extract_token_from_notify`: the marker test is a single C-level
+    substring search, so payloads without it are rejected before any
+    varint is decoded in Python.
+    """
+    if payload.find(READY_MARKER) < 0:
+        return None
+    return extract_token_from_notify(payload)
+
+
 def parse_protobuf_fields(data: bytes) -> dict[int, list[int | bytes]]:
     """Parse a protobuf-like payload into a dict of field_number -> values.
 
@@ -94,26 +137,47 @@ def parse_protobuf_fields(data: bytes) -> dict[int, list[int | bytes]]:
     """
     fields: dict[int, list[int | bytes]] = {}
     pos = 0
-    while pos < len(data):
-        try:
-            tag, pos = parse_varint(data, pos)
-        except ValueError:
-            return fields
+    end = len(data)
+    while pos < end:
+        # Single-byte tags, values and lengths are decoded inline; they are
+        # almost every tag and most values in Glow payloads.
+        tag = data[pos]
+        if tag < 0x80:
+            pos += 1
+        else:
+            if (decoded := _try_parse_varint(data, pos)) is None:
+                return fields
+            tag, pos = decoded
         field_number = tag >> 3
         wire_type = tag & 0x07
 
         if wire_type == 0:  # varint
-            try:
-                value, pos = parse_varint(data, pos)
-            except ValueError:
-                return fields
+            if pos < end and data[pos] < 0x80:
+                value = data[pos]
+                pos += 1
+            else:
+                # Multi-byte varint (tokens, timestamps), decoded in place
+                value = 0
+                shift = 0
+                while True:
+                    if pos == end:
+                        return fields
+                    byte = data[pos]
+                    pos += 1
+                    value |= (byte & 0x7F) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
             fields.setdefault(field_number, []).append(value)
         elif wire_type == 2:  # length-delimited
-            try:
-                length, pos = parse_varint(data, pos)
-            except ValueError:
-                return fields
-            if pos + length > len(data):
+            if pos < end and data[pos] < 0x80:
+                length = data[pos]
+                pos += 1
+            else:
+                if (decoded := _try_parse_varint(data, pos)) is None:
+                    return fields
+                length, pos = decoded
+            if pos + length > end:
                 return fields
             fields.setdefault(field_number, []).append(data[pos : pos + length])
             pos += length
@@ -123,6 +187,23 @@ def parse_protobuf_fields(data: bytes) -> dict[int, list[int | bytes]]:
     return fields
 
 
+@functools.lru_cache(maxsize=256)
+def parse_protobuf_field_items(
+    data: bytes,
+) -> tuple[tuple[int, tuple[int | bytes, ...]], ...]:
+    """Parse a payload into ``(field_number, values)`` pairs, memoised.
+
+    Same decoding as :func:`parse_protobuf_fields`, but the result is an
+    immutable tuple sorted by field number so it can be cached safely.
+    Intended for dump/inspection code that re-parses identical
+    sub-messages; the hot command path uses the uncached dict form.
+    """
+    return tuple(
+        (field_number, tuple(values))
+        for field_number, values in sorted(parse_protobuf_fields(data).items())
+    )
+
+
 def parse_state_response(notification: bytes) -> dict[int, list[int | bytes]] | None:
     """Extract and decode the state response (field 19) from a notification.
 
@@ -132,24 +213,68 @@ def parse_state_response(notification: bytes) -> dict[int, list[int | bytes]] |
     Returns the parsed sub-fields of the field-19 body, or None if
     the notification does not contain a state response.
     """
-    top = parse_protobuf_fields(notification)
-
     # Field 19 is nested inside field 4's body
-    field4_values = top.get(4)
-    if not field4_values:
+    field4_body = _last_length_delimited(notification, 4)
+    if field4_body is None:
         return None
-    field4_body = field4_values[-1]
-    if not isinstance(field4_body, bytes):
+    body = _last_length_delimited(field4_body, STATE_RESPONSE_FIELD)
+    if body is None:
         return None
+    return parse_protobuf_fields(body)
 
-    inner = parse_protobuf_fields(field4_body)
-    state_values = inner.get(STATE_RESPONSE_FIELD)
-    if not state_values:
-        return None
-    body = state_values[-1]
-    if not isinstance(body, bytes):
+
+def _last_length_delimited(data: bytes, field_number: int) -> bytes | None:
+    """Return the last value of *field_number* if it is length-delimited.
+
+    Same result as taking ``parse_protobuf_fields(data)[field_number][-1]``
+    (None if absent or a varint), but other fields are skipped instead of
+    being decoded into a dict.
+    """
+    # Offsets of the last match; the value is sliced once, on return
+    found_start = found_end = -1
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag = data[pos]
+        if tag < 0x80:
+            pos += 1
+        else:
+            if (decoded := _try_parse_varint(data, pos)) is None:
+                break
+            tag, pos = decoded
+        wire_type = tag & 0x07
+
+        if wire_type == 0:  # varint: skip continuation bytes
+            while pos < end and data[pos] & 0x80:
+                pos += 1
+            if pos == end:
+                break
+            pos += 1
+            if tag >> 3 == field_number:
+                found_start = -1
+        elif wire_type == 2:  # length-delimited
+            if pos < end and data[pos] < 0x80:
+                length = data[pos]
+                pos += 1
+            else:
+                if (decoded := _try_parse_varint(data, pos)) is None:
+                    break
+                length, pos = decoded
+            if pos + length > end:
+                break
+            if tag >> 3 == field_number:
+                found_start = pos
+                found_end = pos + length
+            pos += length
+        else:
+            break
+    if found_start < 0:
         return None
-    return parse_protobuf_fields(body)
+    return data[found_start:found_end]
+
+
+# Fields 1 (= 1) and the tag of field 2 (token), shared by every packet
+_ACTION_PACKET_HEADER = b"\x08\x01\x10"
 
 
 def build_action_packet(token: int, action_body: bytes) -> bytes:
@@ -160,20 +285,42 @@ def build_action_packet(token: int, action_body: bytes) -> bytes:
       field 2 (varint) = token       (session token, tag 0x10)
       field 4 (length-delimited) = action_body  (tag 0x22)
     """
+    body_len = len(action_body)
+    if 0 <= token < 0x80 and body_len < 0x80:
+        # Token and body length are single-byte varints: emit the bytes
+        # between header and body as one object instead of four.
+        return _ACTION_PACKET_HEADER + bytes((token, 0x22, body_len)) + action_body
     return (
-        b"\x08\x01"
-        + b"\x10"
+        _ACTION_PACKET_HEADER
         + encode_varint(token)
         + b"\x22"
-        + encode_varint(len(action_body))
+        + encode_varint(body_len)
         + action_body
     )
 
 
+def action_packet_template(action_body: bytes) -> Callable[[int], bytes]:
+    """Return a builder equivalent to ``build_action_packet(token, action_body)``.
+
+    Everything after the token is encoded once up front, so building the
+    packet for a fixed body only encodes the token varint.  Packets are
+    also memoised per token, since a session reuses one token for every
+    command it sends.
+    """
+    suffix = b"\x22" + encode_varint(len(action_body)) + action_body
+
+    @functools.lru_cache(maxsize=16)
+    def _build(token: int) -> bytes:
+        return _ACTION_PACKET_HEADER + encode_varint(token) + suffix
+
+    return _build
+
+
 # Protobuf tag for field 18 (wire type 2) — two-byte varint: (18 << 3) | 2 = 146
 _FIELD_18_TAG = encode_varint((18 << 3) | 2)
 
 
+@functools.lru_cache(maxsize=64)
 def build_brightness_body(
     brightness_pct: int,
     dimming_time_ms: int,
@@ -184,12 +331,16 @@ def build_brightness_body(
       sub-field 2 = brightness percentage (60–100, in steps of 10)
       sub-field 3 = dimming time in milliseconds
 
+    Results are memoised: the app's levels and dimming times make up
+    only 25 distinct bodies.
+
     Verified against iOS app BLE captures.
     """
-    inner = (
-        b"\x10"
-        + encode_varint(brightness_pct)
-        + b"\x18"
-        + encode_varint(dimming_time_ms)
-    )
+    dimming = encode_varint(dimming_time_ms)
+    if 0 <= brightness_pct < 0x80:
+        # Length prefix, both sub-field tags and the brightness are single
+        # bytes (a varint is at most 10 bytes, so the length is too).
+        header = bytes((3 + len(dimming), 0x10, brightness_pct, 0x18))
+        return _FIELD_18_TAG + header + dimming
+    inner = b"\x10" + encode_varint(brightness_pct) + b"\x18" + dimming
     return _FIELD_18_TAG + encode_varint(len(inner)) + inner
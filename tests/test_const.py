@@ -0,0 +1,22 @@
+"""Tests for protocol constants."""
+
+import pytest
+
+from pycasperglow import const
+
+
+@pytest.mark.parametrize(
+    ("name", "expected_hex"),
+    [
+        ("RECONNECT_PACKET", "080122026a00"),
+        ("READY_MARKER", "72020800"),
+        ("ACTION_BODY_ON", "1a020802"),
+        ("ACTION_BODY_OFF", "1a020804"),
+        ("ACTION_BODY_PAUSE", "1a020805"),
+        ("ACTION_BODY_RESUME", "1a020806"),
+        ("QUERY_STATE_BODY", "52020803"),
+    ],
+)
+def test_packet_constants_match_captures(name: str, expected_hex: str) -> None:
+    """Bytes literals must match the hex captured from the iOS app."""
+    assert getattr(const, name) == bytes.fromhex(expected_hex)
@@ -0,0 +1,237 @@
+"""Tests for the pycasperglow daemon."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import socket
+import stat
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from pycasperglow.daemon import GlowDaemon, default_socket_path, send_command
+from pycasperglow.device import BatteryLevel, CasperGlow, GlowState
+
+
+def _make_device(name: str = "JarGlow", address: str = "AA:BB:CC:DD:EE:FF") -> Any:
+    device = MagicMock()
+    device.name = name
+    device.address = address
+    return device
+
+
+def _make_adv(local_name: str | None) -> Any:
+    adv = MagicMock()
+    adv.local_name = local_name
+    adv.manufacturer_data = {}
+    return adv
+
+
+def _make_daemon(*devices: Any) -> GlowDaemon:
+    daemon = GlowDaemon()
+    for device in devices:
+        daemon._on_detection(device, _make_adv(device.name))
+    return daemon
+
+
+class _FakeScanner:
+    def __init__(self, **kwargs: Any) -> None:
+        pass
+
+    async def __aenter__(self) -> _FakeScanner:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+
+class TestGlowDaemon:
+    """GlowDaemon command handling tests."""
+
+    async def test_discover_lists_only_glows(self) -> None:
+        daemon = _make_daemon(
+            _make_device(), _make_device(name="Speaker", address="11:22:33:44:55:66")
+        )
+
+        reply = await daemon.handle_command({"cmd": "discover"})
+
+        assert reply == {
+            "ok": True,
+            "devices": [{"address": "AA:BB:CC:DD:EE:FF", "name": "JarGlow"}],
+        }
+
+    async def test_action_reuses_connection(self) -> None:
+        daemon = _make_daemon(_make_device())
+        client = AsyncMock()
+        turn_on = AsyncMock()
+
+        with (
+            patch(
+                "pycasperglow.device.establish_connection", return_value=client
+            ) as establish,
+            patch.dict("pycasperglow.daemon._ACTIONS", {"on": turn_on}),
+        ):
+            first = await daemon.handle_command(
+                {"cmd": "on", "address": "AA:BB:CC:DD:EE:FF"}
+            )
+            second = await daemon.handle_command(
+                {"cmd": "on", "address": "AA:BB:CC:DD:EE:FF"}
+            )
+
+        assert first == second == {"ok": True}
+        establish.assert_called_once()
+        assert turn_on.await_count == 2
+
+    async def test_state_reply(self) -> None:
+        daemon = _make_daemon(_make_device())
+        state = GlowState(is_on=True, battery_level=BatteryLevel.PCT_50)
+
+        with (
+            patch("pycasperglow.device.establish_connection", return_value=AsyncMock()),
+            patch.object(CasperGlow, "query_state", AsyncMock(return_value=state)),
+        ):
+            reply = await daemon.handle_command(
+                {"cmd": "state", "address": "AA:BB:CC:DD:EE:FF"}
+            )
+
+        assert reply["ok"] is True
+        assert reply["state"]["is_on"] is True
+        assert reply["state"]["battery_percentage"] == 50
+
+    @pytest.mark.parametrize(
+        ("command", "error"),
+        [
+            ({"cmd": "explode"}, "Unknown command"),
+            ({"cmd": "on"}, "Missing device address"),
+            ({"cmd": "on", "address": "00:00:00:00:00:00"}, "not been discovered"),
+        ],
+        ids=["unknown_cmd", "missing_address", "unknown_device"],
+    )
+    async def test_errors(self, command: dict[str, Any], error: str) -> None:
+        daemon = _make_daemon(_make_device())
+
+        reply = await daemon.handle_command(command)
+
+        assert reply["ok"] is False
+        assert error in reply["error"]
+
+    async def test_failed_connect_is_retried(self) -> None:
+        daemon = _make_daemon(_make_device())
+
+        with patch(
+            "pycasperglow.device.establish_connection",
+            side_effect=[TimeoutError("no link"), AsyncMock()],
+        ):
+            first = await daemon.handle_command(
+                {"cmd": "state", "address": "AA:BB:CC:DD:EE:FF"}
+            )
+            with patch.object(
+                CasperGlow, "query_state", AsyncMock(return_value=GlowState())
+            ):
+                second = await daemon.handle_command(
+                    {"cmd": "state", "address": "AA:BB:CC:DD:EE:FF"}
+                )
+
+        assert first == {"ok": False, "error": "no link"}
+        assert second["ok"] is True
+
+    async def test_socket_round_trip(self, tmp_path: Path) -> None:
+        socket_path = tmp_path / "d.sock"
+        daemon = _make_daemon(_make_device())
+
+        with patch("pycasperglow.daemon.BleakScanner", _FakeScanner):
+            task = asyncio.create_task(daemon.serve(socket_path))
+            for _ in range(100):
+                if socket_path.exists():
+                    break
+                await asyncio.sleep(0.01)
+            try:
+                mode = stat.S_IMODE(socket_path.stat().st_mode)
+                reply = await send_command({"cmd": "discover"}, socket_path)
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+        assert reply["devices"] == [{"address": "AA:BB:CC:DD:EE:FF", "name": "JarGlow"}]
+        assert mode == 0o600
+        assert not socket_path.exists()
+
+    async def test_replaces_stale_socket(self, tmp_path: Path) -> None:
+        socket_path = tmp_path / "d.sock"
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(str(socket_path))
+        daemon = _make_daemon(_make_device())
+
+        with patch("pycasperglow.daemon.BleakScanner", _FakeScanner):
+            task = asyncio.create_task(daemon.serve(socket_path))
+            try:
+                for _ in range(100):
+                    with contextlib.suppress(OSError):
+                        reply = await send_command({"cmd": "discover"}, socket_path)
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+        assert reply["ok"] is True
+
+    async def test_refuses_to_unlink_regular_file(self, tmp_path: Path) -> None:
+        socket_path = tmp_path / "d.sock"
+        socket_path.write_text("not a socket")
+
+        with pytest.raises(OSError, match="Refusing"):
+            await GlowDaemon().serve(socket_path)
+
+        assert socket_path.read_text() == "not a socket"
+
+    async def test_refuses_to_unlink_foreign_socket(self, tmp_path: Path) -> None:
+        socket_path = tmp_path / "d.sock"
+        with socket.socket(socket.AF_UNIX) as other:
+            other.bind(str(socket_path))
+
+        with (
+            patch("pycasperglow.daemon.os.getuid", return_value=os.getuid() + 1),
+            pytest.raises(OSError, match="Refusing"),
+        ):
+            await GlowDaemon().serve(socket_path)
+
+        assert socket_path.exists()
+
+    async def test_creates_private_socket_directory(self, tmp_path: Path) -> None:
+        socket_path = tmp_path / "run" / "d.sock"
+
+        with (
+            patch("pycasperglow.daemon._remove_stale_socket", side_effect=OSError),
+            pytest.raises(OSError),
+        ):
+            await GlowDaemon().serve(socket_path)
+
+        assert stat.S_IMODE(socket_path.parent.stat().st_mode) == 0o700
+
+    async def test_send_command_without_daemon(self, tmp_path: Path) -> None:
+        with pytest.raises(OSError):
+            await send_command({"cmd": "discover"}, tmp_path / "missing.sock")
+
+
+class TestDefaultSocketPath:
+    """default_socket_path tests."""
+
+    def test_prefers_runtime_dir(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        assert default_socket_path() == tmp_path / "pycasperglow.sock"
+
+    def test_falls_back_to_user_cache_dir(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_socket_path() == tmp_path / "pycasperglow" / "daemon.sock"
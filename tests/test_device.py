@@ -2,10 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import itertools
+from collections.abc import Awaitable, Callable
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 import pytest
+from bleak.exc import BleakError
 
 from pycasperglow.const import (
     ACTION_BODY_OFF,
@@ -14,18 +19,58 @@ from pycasperglow.const import (
     ACTION_BODY_RESUME,
     QUERY_STATE_BODY,
     READ_CHAR_UUID,
+    READY_MARKER,
     RECONNECT_PACKET,
     WRITE_CHAR_UUID,
 )
-from pycasperglow.device import BatteryLevel, CasperGlow
+from pycasperglow.device import BatteryLevel, CasperGlow, _NotifyHandler
 from pycasperglow.exceptions import HandshakeTimeoutError
 from pycasperglow.protocol import (
+    STATE_RESPONSE_FIELD,
     build_action_packet,
     build_brightness_body,
     encode_varint,
+    parse_state_response,
 )
 
 
+async def _ignore(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
+class _RecordingCoro:
+    """Async stand-in for an ``AsyncMock(side_effect=...)`` client method.
+
+    Records ``call_args_list`` and awaits ``side_effect`` directly, without
+    unittest.mock's call dispatch on every simulated GATT write.
+    """
+
+    def __init__(self, side_effect: Callable[..., Awaitable[None]] = _ignore) -> None:
+        self.side_effect = side_effect
+        self.call_args_list: list[Any] = []
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> None:
+        self.call_args_list.append(call(*args, **kwargs))
+        await self.side_effect(*args, **kwargs)
+
+    @property
+    def call_count(self) -> int:
+        return len(self.call_args_list)
+
+    @property
+    def call_args(self) -> Any:
+        return self.call_args_list[-1] if self.call_args_list else None
+
+    def reset_mock(self) -> None:
+        self.call_args_list.clear()
+
+    def assert_called_once(self) -> None:
+        assert self.call_count == 1, f"Awaited {self.call_count} times"
+
+    def assert_not_called(self) -> None:
+        assert not self.call_args_list, f"Awaited {self.call_count} times"
+
+
 def _make_ble_device(name: str = "JarGlow", address: str = "AA:BB:CC:DD:EE:FF") -> Any:
     device = MagicMock()
     device.name = name
@@ -33,34 +78,62 @@ def _make_ble_device(name: str = "JarGlow", address: str = "AA:BB:CC:DD:EE:FF")
     return device
 
 
+@functools.cache
+def _ready_blob(token: int) -> bytes:
+    """Return the ready notification bytes for *token* (built once per token)."""
+    # field 1 varint (token), then ready marker bytes
+    return b"\x08" + encode_varint(token) + READY_MARKER
+
+
 def _make_ready_notification(token: int = 42) -> bytearray:
-    """Build a notification payload with field 1 = token and embedded ready marker."""
-    from pycasperglow.protocol import encode_varint
+    """Build a notification payload with field 1 = token and embedded ready marker.
 
-    # field 1 varint (token), then ready marker bytes
-    return bytearray(b"\x08" + encode_varint(token) + bytes.fromhex("72020800"))
+    Returned as a fresh ``bytearray``, as bleak delivers notifications.
+    """
+    return bytearray(_ready_blob(token))
+
+
+class _MockBleClient:
+    """Stand-in for a BleakClient that simulates the Glow's notifications.
 
+    The reconnect packet is answered with a ready notification for
+    *ready_token* (none if it is None, so the handshake never completes).
+    Every other write is answered with *state_notification*, if given.
+    """
 
-def _make_mock_client(ready_token: int = 42) -> AsyncMock:
-    """Create a mock BleakClient that simulates the handshake."""
-    client = AsyncMock()
-    client.is_connected = True
+    _notify_callback: Callable[[Any, bytes | bytearray], None]
 
-    async def _start_notify(char_uuid: str, callback: Any) -> None:
+    def __init__(
+        self, ready_token: int | None = 42, state_notification: bytes | None = None
+    ) -> None:
+        self.is_connected = True
+        self._ready_token = ready_token
+        self._state_notification = state_notification
+        self.start_notify = _RecordingCoro(self._start_notify)
+        self.write_gatt_char = _RecordingCoro(self._write_gatt_char)
+        self.connect = _RecordingCoro(self._connect)
+        self.disconnect = _RecordingCoro()
+
+    async def _connect(self) -> None:
+        self.is_connected = True
+
+    async def _start_notify(
+        self, char_uuid: str, callback: Callable[[Any, bytes | bytearray], None]
+    ) -> None:
         # Store callback so write_gatt_char can trigger it
-        client._notify_callback = callback
+        self._notify_callback = callback
 
-    async def _write_gatt_char(char_uuid: str, data: bytes) -> None:
+    async def _write_gatt_char(self, char_uuid: str, data: bytes) -> None:
         if data == RECONNECT_PACKET:
-            # Simulate device sending ready notification
-            notification = _make_ready_notification(ready_token)
-            client._notify_callback(None, notification)
-
-    client.start_notify = AsyncMock(side_effect=_start_notify)
-    client.write_gatt_char = AsyncMock(side_effect=_write_gatt_char)
-    return client
+            if self._ready_token is not None:
+                # Simulate device sending ready notification
+                self._notify_callback(None, _make_ready_notification(self._ready_token))
+        elif self._state_notification is not None:
+            # For any other write (e.g. state query), send a state notification
+            self._notify_callback(None, self._state_notification)
 
 
+@functools.cache
 def _make_state_notification(
     *,
     is_on: bool = False,
@@ -68,7 +141,7 @@ def _make_state_notification(
     is_charging: bool = False,
     token: int = 42,
     dimming_ms: int = 0,
-    remaining_ms: int = 0,
+    remaining_ms: int | None = None,
     battery: int = 6,
 ) -> bytes:
     """Build a notification with field 1 (token) and field 4 containing field 19.
@@ -82,40 +155,53 @@ def _make_state_notification(
     * sub-field 7: nested message with inner field 1 = charging indicator
         (0 = not charging, 3 = charging observed); inner field 2 = battery level enum
         (6 = full, 3 = low; others unknown)
-    """
-    from pycasperglow.protocol import STATE_RESPONSE_FIELD
 
+    *remaining_ms* defaults to *dimming_ms* (a sequence that has just
+    started).  Cached per argument combination; the result is immutable
+    ``bytes``.
+    """
+    if remaining_ms is None:
+        remaining_ms = dimming_ms
     power_indicator = 1 if is_on else 3
     paused_indicator = 1 if is_paused else 0
     # Sub-field 7: nested message with inner field 1 = charging, inner field 2 = battery
-    battery_inner = (
-        b"\x08"
-        + encode_varint(3 if is_charging else 0)  # inner f1: charging
-        + b"\x10"
-        + encode_varint(battery)  # inner f2: battery
+    battery_inner = b"".join(
+        [
+            b"\x08",
+            encode_varint(3 if is_charging else 0),  # inner f1: charging
+            b"\x10",
+            encode_varint(battery),  # inner f2: battery
+        ]
     )
-    battery_sf7 = b"\x3a" + encode_varint(len(battery_inner)) + battery_inner
-    state_inner = (
-        b"\x08"
-        + encode_varint(power_indicator)  # sub-field 1
-        + b"\x10"
-        + encode_varint(remaining_ms)  # sub-field 2: remaining
-        + b"\x18"
-        + encode_varint(dimming_ms)  # sub-field 3: configured total
-        + b"\x20"
-        + encode_varint(paused_indicator)  # sub-field 4
-        + battery_sf7  # sub-field 7
+    state_inner = b"".join(
+        [
+            b"\x08",
+            encode_varint(power_indicator),  # sub-field 1
+            b"\x10",
+            encode_varint(remaining_ms),  # sub-field 2: remaining
+            b"\x18",
+            encode_varint(dimming_ms),  # sub-field 3: configured total
+            b"\x20",
+            encode_varint(paused_indicator),  # sub-field 4
+            b"\x3a",
+            encode_varint(len(battery_inner)),  # sub-field 7
+            battery_inner,
+        ]
     )
     # field 19, wire type 2
     tag_19 = (STATE_RESPONSE_FIELD << 3) | 2
-    field4_body = encode_varint(tag_19) + encode_varint(len(state_inner)) + state_inner
+    field4_body = b"".join(
+        [encode_varint(tag_19), encode_varint(len(state_inner)), state_inner]
+    )
     # Wrap in top-level notification: field 1 (token), field 4 (body)
-    return (
-        b"\x08"
-        + encode_varint(token)
-        + b"\x22"
-        + encode_varint(len(field4_body))
-        + field4_body
+    return b"".join(
+        [
+            b"\x08",
+            encode_varint(token),
+            b"\x22",
+            encode_varint(len(field4_body)),
+            field4_body,
+        ]
     )
 
 
@@ -127,131 +213,160 @@ def _make_mock_client_with_state(
     is_charging: bool = False,
     dimming_ms: int = 900_000,
     battery: int = 6,
-) -> AsyncMock:
+) -> _MockBleClient:
     """Create a mock BleakClient that simulates handshake + state response."""
-    client = AsyncMock()
-    client.is_connected = True
+    # Delivered as-is: the notify handler only reads the payload
+    state_notification = _make_state_notification(
+        is_on=is_on,
+        is_paused=is_paused,
+        is_charging=is_charging,
+        token=ready_token,
+        dimming_ms=dimming_ms,
+        battery=battery,
+    )
+    return _MockBleClient(ready_token, state_notification)
 
-    async def _start_notify(char_uuid: str, callback: Any) -> None:
-        client._notify_callback = callback
 
-    async def _write_gatt_char(char_uuid: str, data: bytes) -> None:
-        if data == RECONNECT_PACKET:
-            notification = _make_ready_notification(ready_token)
-            client._notify_callback(None, notification)
-        else:
-            # For any other write (e.g. state query), send a state notification
-            state_notif = bytearray(
-                _make_state_notification(
-                    is_on=is_on,
-                    is_paused=is_paused,
-                    is_charging=is_charging,
-                    token=ready_token,
-                    dimming_ms=dimming_ms,
-                    remaining_ms=dimming_ms,
-                    battery=battery,
-                )
-            )
-            client._notify_callback(None, state_notif)
+# Packets the mock clients expect for their default session token (42)
+_ON_PACKET = build_action_packet(42, ACTION_BODY_ON)
+_OFF_PACKET = build_action_packet(42, ACTION_BODY_OFF)
+_PAUSE_PACKET = build_action_packet(42, ACTION_BODY_PAUSE)
+_RESUME_PACKET = build_action_packet(42, ACTION_BODY_RESUME)
+_QUERY_PACKET = build_action_packet(42, QUERY_STATE_BODY)
+_BRIGHTNESS_80_30M = build_brightness_body(80, 30 * 60_000)
+_BRIGHTNESS_80_30M_PACKET = build_action_packet(42, _BRIGHTNESS_80_30M)
 
-    client.start_notify = AsyncMock(side_effect=_start_notify)
-    client.write_gatt_char = AsyncMock(side_effect=_write_gatt_char)
-    return client
+# Never mutated by the client, so one instance serves every test
+_DEVICE = _make_ble_device()
 
 
 @pytest.fixture
 def device() -> Any:
-    return _make_ble_device()
+    return _DEVICE
+
+
+@pytest.fixture
+def mock_client() -> Any:
+    return _MockBleClient()
+
+
+@pytest.fixture
+def state_client() -> Any:
+    return _make_mock_client_with_state()
 
 
 @pytest.fixture
-def mock_client() -> AsyncMock:
-    return _make_mock_client()
+def make_state_client() -> Callable[..., Any]:
+    return _make_mock_client_with_state
 
 
 @pytest.fixture
-def glow(device: Any, mock_client: AsyncMock) -> CasperGlow:
+def glow(device: Any, mock_client: Any) -> CasperGlow:
     return CasperGlow(device, client=mock_client)
 
 
+class TestBatteryLevel:
+    """BatteryLevel conversion tests."""
+
+    @pytest.mark.parametrize(
+        ("raw", "expected", "text"),
+        [
+            (3, BatteryLevel.PCT_25, "25%"),
+            (4, BatteryLevel.PCT_50, "50%"),
+            (5, BatteryLevel.PCT_75, "75%"),
+            (6, BatteryLevel.PCT_100, "100%"),
+        ],
+    )
+    def test_from_raw(self, raw: int, expected: BatteryLevel, text: str) -> None:
+        level = BatteryLevel.from_raw(raw)
+        assert level is expected
+        assert str(level) == text
+
+    @pytest.mark.parametrize("raw", [0, 2, 7, 100])
+    def test_from_raw_unknown(self, raw: int) -> None:
+        assert BatteryLevel.from_raw(raw) is None
+
+
 class TestCasperGlow:
     """CasperGlow client tests."""
 
     @pytest.mark.parametrize(
-        ("method_name", "action_body", "state_attr", "state_val"),
+        ("method_name", "packet", "state_attr", "state_val"),
         [
-            ("turn_on", ACTION_BODY_ON, None, None),
-            ("turn_off", ACTION_BODY_OFF, None, None),
-            ("pause", ACTION_BODY_PAUSE, "is_paused", True),
-            ("resume", ACTION_BODY_RESUME, "is_paused", False),
+            ("turn_on", _ON_PACKET, None, None),
+            ("turn_off", _OFF_PACKET, None, None),
+            ("pause", _PAUSE_PACKET, "is_paused", True),
+            ("resume", _RESUME_PACKET, "is_paused", False),
         ],
         ids=["turn_on", "turn_off", "pause", "resume"],
     )
     async def test_command_writes_correct_packet(
         self,
+        glow: CasperGlow,
+        mock_client: Any,
         method_name: str,
-        action_body: bytes,
+        packet: bytes,
         state_attr: str | None,
         state_val: bool | None,
     ) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client(ready_token=42)
-        glow = CasperGlow(device, client=client)
 
         await getattr(glow, method_name)()
 
-        calls = client.write_gatt_char.call_args_list
+        calls = mock_client.write_gatt_char.call_args_list
         assert len(calls) == 2
         assert calls[0].args == (WRITE_CHAR_UUID, RECONNECT_PACKET)
-        assert calls[1].args == (WRITE_CHAR_UUID, build_action_packet(42, action_body))
+        assert calls[1].args == (WRITE_CHAR_UUID, packet)
         if state_attr is not None:
             assert getattr(glow.state, state_attr) is state_val
 
     async def test_subscribes_to_notifications(
-        self, glow: CasperGlow, mock_client: AsyncMock
+        self, glow: CasperGlow, mock_client: Any
     ) -> None:
         await glow.turn_on()
 
         mock_client.start_notify.assert_called_once()
         assert mock_client.start_notify.call_args.args[0] == READ_CHAR_UUID
 
-    async def test_handshake_timeout(self) -> None:
-        device = _make_ble_device()
-        client = AsyncMock()
-        client.is_connected = True
-        client.start_notify = AsyncMock()
-        client.write_gatt_char = AsyncMock()  # Never triggers ready
+    async def test_handshake_timeout(self, device: Any) -> None:
+        client: Any = _MockBleClient(ready_token=None)  # Never triggers ready
 
-        glow = CasperGlow(device, client=client)
+        glow = CasperGlow(device, client=client, handshake_timeout=0.0)
 
-        with (
-            patch("pycasperglow.device.HANDSHAKE_TIMEOUT", 0.1),
-            pytest.raises(HandshakeTimeoutError),
-        ):
+        with pytest.raises(HandshakeTimeoutError, match="within 0.0s"):
             await glow.turn_on()
 
-    async def test_disconnect_on_success(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client()
+    async def test_ready_during_write_skips_wait(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        # The mock delivers the ready notification inside the write
+        glow = CasperGlow(device, client=mock_client, handshake_timeout=0.0)
+
+        with patch("pycasperglow.device.asyncio.wait_for") as wait_for:
+            await glow.turn_on()
+
+        wait_for.assert_not_called()
+        assert mock_client.write_gatt_char.call_args.args == (
+            WRITE_CHAR_UUID,
+            _ON_PACKET,
+        )
+
+    async def test_disconnect_on_success(self, device: Any, mock_client: Any) -> None:
         glow = CasperGlow(device)
 
-        with patch("pycasperglow.device.establish_connection", return_value=client):
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
             await glow.turn_on()
 
-        client.disconnect.assert_called_once()
+        mock_client.disconnect.assert_called_once()
 
-    async def test_disconnect_on_error(self) -> None:
-        device = _make_ble_device()
-        client = AsyncMock()
-        client.is_connected = True
-        client.start_notify = AsyncMock()
-        client.write_gatt_char = AsyncMock()
+    async def test_disconnect_on_error(self, device: Any) -> None:
+        client: Any = _MockBleClient(ready_token=None)
 
-        glow = CasperGlow(device)
+        glow = CasperGlow(device, handshake_timeout=0.0)
 
         with (
             patch("pycasperglow.device.establish_connection", return_value=client),
-            patch("pycasperglow.device.HANDSHAKE_TIMEOUT", 0.1),
             pytest.raises(HandshakeTimeoutError),
         ):
             await glow.turn_on()
@@ -259,12 +374,106 @@ class TestCasperGlow:
         client.disconnect.assert_called_once()
 
     async def test_external_client_not_disconnected(
-        self, glow: CasperGlow, mock_client: AsyncMock
+        self, glow: CasperGlow, mock_client: Any
     ) -> None:
         await glow.turn_on()
 
         mock_client.disconnect.assert_not_called()
 
+    async def test_context_manager_reuses_connection(
+        self, device: Any, state_client: Any
+    ) -> None:
+        glow = CasperGlow(device)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=state_client
+        ) as establish:
+            async with glow:
+                await glow.turn_on()
+                await glow.query_state()
+                state_client.disconnect.assert_not_called()
+
+        establish.assert_called_once()
+        state_client.disconnect.assert_called_once()
+
+    async def test_idle_timeout_reuses_connection(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, idle_timeout=0.05, session_token_ttl=30.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ) as establish:
+            await glow.turn_on()
+            await glow.turn_off()
+            mock_client.disconnect.assert_not_called()
+            await asyncio.sleep(0.1)
+
+        establish.assert_called_once()
+        mock_client.disconnect.assert_called_once()
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 1
+
+    async def test_idle_close_skips_reclaimed_connection(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, idle_timeout=60.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            await glow.turn_on()
+            # The timer fires, but a command takes the lock before its close
+            glow._on_idle_timeout()
+            await glow.turn_off()
+            for _ in range(3):
+                await asyncio.sleep(0)
+
+            mock_client.disconnect.assert_not_called()
+            await glow.turn_on()
+
+        assert mock_client.write_gatt_char.call_count == 6
+        await glow.disconnect()
+        mock_client.disconnect.assert_called_once()
+
+    async def test_disconnect_closes_idle_connection(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, idle_timeout=60.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            await glow.turn_on()
+            await glow.disconnect()
+            await glow.turn_off()
+
+        assert mock_client.disconnect.call_count == 1
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 2
+        await glow.disconnect()
+
+    async def test_context_manager_with_external_client(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
+        with patch("pycasperglow.device.establish_connection") as establish:
+            async with glow:
+                await glow.turn_on()
+
+        establish.assert_not_called()
+        mock_client.disconnect.assert_not_called()
+
+    def test_state_uses_slots(self, glow: CasperGlow) -> None:
+        assert not hasattr(glow.state, "__dict__")
+        with pytest.raises(AttributeError):
+            glow.state.brightness = 80  # type: ignore[attr-defined]
+
+    async def test_instance_methods_can_be_patched(self, glow: CasperGlow) -> None:
+        with patch.object(glow, "turn_on") as turn_on:
+            await glow.turn_on()
+
+        turn_on.assert_awaited_once()
+
     async def test_properties(self) -> None:
         device = _make_ble_device(name="JarTest", address="11:22:33:44:55:66")
         glow = CasperGlow(device)
@@ -293,18 +502,14 @@ class TestCasperGlow:
         assert len(states) == 1
         assert getattr(states[0], state_attr) is state_val
 
-    async def test_set_brightness_and_dimming_time_sends_correct_packet(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client(ready_token=42)
-        glow = CasperGlow(device, client=client)
-
+    async def test_set_brightness_and_dimming_time_sends_correct_packet(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
         await glow.set_brightness_and_dimming_time(80, 30)
 
-        calls = client.write_gatt_char.call_args_list
+        calls = mock_client.write_gatt_char.call_args_list
         assert len(calls) == 2
-        expected_body = build_brightness_body(80, 30 * 60_000)
-        expected_packet = build_action_packet(42, expected_body)
-        assert calls[1].args == (WRITE_CHAR_UUID, expected_packet)
+        assert calls[1].args == (WRITE_CHAR_UUID, _BRIGHTNESS_80_30M_PACKET)
         assert glow.state.brightness_level == 80
         assert glow.state.configured_dimming_time_minutes == 30
 
@@ -320,151 +525,465 @@ class TestCasperGlow:
         assert states[0].brightness_level == 70
         assert states[0].configured_dimming_time_minutes == 15
 
-    async def test_set_brightness_and_dimming_time_invalid_level_raises(
-        self, glow: CasperGlow
+    @pytest.mark.parametrize(
+        ("level", "dimming_time_minutes", "error"),
+        [(50, 15, "Invalid brightness"), (80, 20, "Invalid dimming time")],
+        ids=["invalid_level", "invalid_dimming_time"],
+    )
+    async def test_set_brightness_and_dimming_time_invalid_raises(
+        self,
+        glow: CasperGlow,
+        mock_client: Any,
+        level: int,
+        dimming_time_minutes: int,
+        error: str,
     ) -> None:
-        with pytest.raises(ValueError, match="Invalid brightness"):
-            await glow.set_brightness_and_dimming_time(50, 15)
+        with pytest.raises(ValueError, match=error):
+            await glow.set_brightness_and_dimming_time(level, dimming_time_minutes)
 
-    async def test_set_brightness_and_dimming_time_invalid_dimming_time_raises(
-        self, glow: CasperGlow
+        mock_client.write_gatt_char.assert_not_called()
+
+    async def test_cached_token_skips_handshake(
+        self, device: Any, mock_client: Any
     ) -> None:
-        with pytest.raises(ValueError, match="Invalid dimming time"):
-            await glow.set_brightness_and_dimming_time(80, 20)
+        glow = CasperGlow(device, session_token_ttl=30.0)
 
-    async def test_query_state_sends_query_packet(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True)
-        glow = CasperGlow(device, client=client)
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            async with glow:
+                await glow.turn_on()
+                await glow.turn_off()
 
-        state = await glow.query_state()
+        assert [c.args for c in mock_client.write_gatt_char.call_args_list] == [
+            (WRITE_CHAR_UUID, RECONNECT_PACKET),
+            (WRITE_CHAR_UUID, _ON_PACKET),
+            (WRITE_CHAR_UUID, _OFF_PACKET),
+        ]
 
-        calls = client.write_gatt_char.call_args_list
-        assert len(calls) == 2
-        assert calls[0].args == (WRITE_CHAR_UUID, RECONNECT_PACKET)
-        expected_query = build_action_packet(42, QUERY_STATE_BODY)
-        assert calls[1].args == (WRITE_CHAR_UUID, expected_query)
-        assert state.is_on is True
+    async def test_token_reuse_is_opt_in(self, device: Any, mock_client: Any) -> None:
+        glow = CasperGlow(device)
 
-    async def test_query_state_off(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=False)
-        glow = CasperGlow(device, client=client)
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            async with glow:
+                await glow.turn_on()
+                await glow.turn_off()
 
-        state = await glow.query_state()
-        assert state.is_on is False
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 2
 
-    async def test_query_state_battery_level(self) -> None:
-        """battery_level is BatteryLevel.PCT_25 when the device reports raw value 3."""
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=False, battery=3)
-        glow = CasperGlow(device, client=client)
+    async def test_external_client_always_handshakes(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, client=mock_client, session_token_ttl=30.0)
 
-        state = await glow.query_state()
-        assert state.battery_level is BatteryLevel.PCT_25
-        assert state.battery_level.percentage == 25
+        await glow.turn_on()
+        await glow.turn_off()
 
-    async def test_query_state_battery_level_full(self) -> None:
-        """battery_level is BatteryLevel.PCT_100 when the device reports raw value 6."""
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True, battery=6)
-        glow = CasperGlow(device, client=client)
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 2
+
+    async def test_expired_token_handshakes_again(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, session_token_ttl=30.0)
+
+        with (
+            patch("pycasperglow.device.establish_connection", return_value=mock_client),
+            patch("pycasperglow.device.time") as clock,
+        ):
+            clock.monotonic.side_effect = itertools.count(0.0, 60.0)
+            async with glow:
+                await glow.turn_on()
+                await glow.turn_off()
+
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 2
+
+    async def test_disconnect_callback_drops_token(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, session_token_ttl=30.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ) as establish:
+            async with glow:
+                await glow.turn_on()
+                # The link dropped and came back before the next command
+                establish.call_args.kwargs["disconnected_callback"](mock_client)
+                await glow.turn_off()
+
+        assert [c.args[1] for c in mock_client.write_gatt_char.call_args_list] == [
+            RECONNECT_PACKET,
+            _ON_PACKET,
+            RECONNECT_PACKET,
+            _OFF_PACKET,
+        ]
+
+    async def test_reconnect_forces_new_handshake(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, session_token_ttl=30.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            async with glow:
+                await glow.turn_on()
+                mock_client.is_connected = False  # link dropped between commands
+                await glow.turn_off()
+
+        mock_client.connect.assert_called_once()
+        assert [c.args[1] for c in mock_client.write_gatt_char.call_args_list] == [
+            RECONNECT_PACKET,
+            _ON_PACKET,
+            RECONNECT_PACKET,
+            _OFF_PACKET,
+        ]
+
+    async def test_rejected_cached_token_retries_with_handshake(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, session_token_ttl=30.0)
+        write = mock_client.write_gatt_char.side_effect
+        rejected: list[bytes] = []
+
+        async def _write(char_uuid: str, data: bytes) -> None:
+            if data == _OFF_PACKET and not rejected:
+                rejected.append(data)
+                raise BleakError("stale token")
+            await write(char_uuid, data)
+
+        mock_client.write_gatt_char.side_effect = _write
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            async with glow:
+                await glow.turn_on()
+                await glow.turn_off()
+
+        assert [c.args[1] for c in mock_client.write_gatt_char.call_args_list] == [
+            RECONNECT_PACKET,
+            _ON_PACKET,
+            _OFF_PACKET,
+            RECONNECT_PACKET,
+            _OFF_PACKET,
+        ]
+
+    async def test_token_not_cached_for_one_shot_connection(
+        self, device: Any, mock_client: Any
+    ) -> None:
+        glow = CasperGlow(device, session_token_ttl=30.0)
+
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=mock_client
+        ):
+            await glow.turn_on()
+            await glow.turn_off()
+
+        writes = [c.args[1] for c in mock_client.write_gatt_char.call_args_list]
+        assert writes.count(RECONNECT_PACKET) == 2
+
+    async def test_batch_context_manager_single_handshake(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
+        callback = MagicMock()
+        glow.register_callback(callback)
+
+        async with glow.batch() as batch:
+            batch.turn_on()
+            batch.set_brightness_and_dimming_time(80, 30)
+            mock_client.write_gatt_char.assert_not_called()
+
+        assert [c.args for c in mock_client.write_gatt_char.call_args_list] == [
+            (WRITE_CHAR_UUID, RECONNECT_PACKET),
+            (WRITE_CHAR_UUID, _ON_PACKET),
+            (WRITE_CHAR_UUID, _BRIGHTNESS_80_30M_PACKET),
+        ]
+        assert glow.state.is_on is True
+        assert glow.state.brightness_level == 80
+        assert glow.state.configured_dimming_time_minutes == 30
+        callback.assert_called_once_with(glow.state)
+
+    async def test_batch_not_sent_on_error(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
+        with pytest.raises(RuntimeError):
+            async with glow.batch() as batch:
+                batch.turn_off()
+                raise RuntimeError("abort")
+
+        mock_client.write_gatt_char.assert_not_called()
+        assert glow.state.is_on is None
+
+    async def test_batch_rejects_invalid_brightness(self, glow: CasperGlow) -> None:
+        async with glow.batch() as batch:
+            with pytest.raises(ValueError, match="Invalid brightness"):
+                batch.set_brightness_and_dimming_time(50, 30)
+
+    async def test_empty_batch_sends_nothing(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
+        async with glow.batch():
+            pass
+
+        mock_client.start_notify.assert_not_called()
+
+    async def test_query_state_round_trip(self, device: Any, state_client: Any) -> None:
+        glow = CasperGlow(device, client=state_client)
+        states: list[Any] = []
+        glow.register_callback(states.append)
 
         state = await glow.query_state()
-        assert state.battery_level is BatteryLevel.PCT_100
-        assert state.battery_level.percentage == 100
 
-    async def test_query_state_brightness(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True)
-        glow = CasperGlow(device, client=client)
+        assert [c.args for c in state_client.write_gatt_char.call_args_list] == [
+            (WRITE_CHAR_UUID, RECONNECT_PACKET),
+            (WRITE_CHAR_UUID, _QUERY_PACKET),
+        ]
+        assert states == [state]
+        state_client.disconnect.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("client_kwargs", "expected"),
+        [
+            (
+                {},
+                {
+                    "is_on": True,
+                    "battery_level": BatteryLevel.PCT_100,
+                    "configured_dimming_time_minutes": 15,
+                    "dimming_time_remaining_ms": 900_000,
+                    "dimming_time_minutes": 15,
+                },
+            ),
+            ({"is_on": False}, {"is_on": False}),
+            ({"is_on": False, "battery": 3}, {"battery_level": BatteryLevel.PCT_25}),
+        ],
+        ids=["on", "off", "battery_low"],
+    )
+    async def test_query_state_fields(
+        self,
+        device: Any,
+        make_state_client: Callable[..., Any],
+        client_kwargs: dict[str, Any],
+        expected: dict[str, Any],
+    ) -> None:
+        glow = CasperGlow(device, client=make_state_client(**client_kwargs))
 
         state = await glow.query_state()
-        assert state.configured_dimming_time_minutes == 15
-        assert state.dimming_time_remaining_ms == 900_000
-        assert state.dimming_time_minutes == 15
 
-    async def test_query_state_fires_callback(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True)
-        glow = CasperGlow(device, client=client)
+        assert {name: getattr(state, name) for name in expected} == expected
+
+    async def test_unchanged_state_does_not_refire(
+        self, glow: CasperGlow, mock_client: Any
+    ) -> None:
         states: list[Any] = []
-        glow.register_callback(lambda s: states.append(s))
+        glow.register_callback(states.append)
 
-        await glow.query_state()
+        await glow.turn_on()
+        await glow.turn_on()
+        await glow.turn_off()
 
-        assert len(states) == 1
-        assert states[0].is_on is True
+        assert len(states) == 2
+
+    async def test_new_callback_receives_unchanged_state(
+        self, glow: CasperGlow
+    ) -> None:
+        await glow.turn_on()
+        callback = MagicMock()
+        glow.register_callback(callback)
+
+        await glow.turn_on()
+
+        callback.assert_called_once_with(glow.state)
+
+    async def test_callback_can_unregister_itself(self, glow: CasperGlow) -> None:
+        calls: list[str] = []
+
+        def _once(_state: Any) -> None:
+            calls.append("once")
+            unregister()
+
+        unregister = glow.register_callback(_once)
+        glow.register_callback(lambda _state: calls.append("always"))
+
+        await glow.turn_on()
+        await glow.turn_off()
+        unregister()  # already removed: no error
+
+        assert calls == ["once", "always", "always"]
 
-    async def test_query_state_external_client_not_disconnected(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True)
+    async def test_query_state_ignores_repeated_ready_and_state(
+        self, device: Any, make_state_client: Callable[..., Any]
+    ) -> None:
+        client = make_state_client(ready_token=7)
+        write = client.write_gatt_char.side_effect
+
+        async def _write_twice(char_uuid: str, data: bytes) -> None:
+            await write(char_uuid, data)
+            await write(char_uuid, data)
+
+        client.write_gatt_char.side_effect = _write_twice
         glow = CasperGlow(device, client=client)
 
         await glow.query_state()
-        client.disconnect.assert_not_called()
 
-    async def test_query_state_disconnect_on_success(self) -> None:
-        device = _make_ble_device()
-        client = _make_mock_client_with_state(ready_token=42, is_on=True)
+        query = build_action_packet(7, QUERY_STATE_BODY)
+        assert client.write_gatt_char.call_args_list[-1].args == (
+            WRITE_CHAR_UUID,
+            query,
+        )
+        assert glow.state.is_on is True
+
+    async def test_query_state_records_notifications(
+        self, device: Any, state_client: Any
+    ) -> None:
+        glow = CasperGlow(device, client=state_client)
+
+        state = await glow.query_state()
+
+        assert len(state.raw_notifications) == 2
+        assert state.raw_notifications[0] == _ready_blob(42)
+        assert state.raw_notifications[1] == state.raw_state
+
+    async def test_query_state_drains_late_notifications(
+        self, device: Any, state_client: Any
+    ) -> None:
+        glow = CasperGlow(device, client=state_client)
+        state_write = state_client.write_gatt_char.side_effect
+
+        async def _write_then_burst(char_uuid: str, data: bytes) -> None:
+            await state_write(char_uuid, data)
+            if data != RECONNECT_PACKET:
+                asyncio.get_running_loop().call_later(
+                    0.01, state_client._notify_callback, None, bytearray(b"\x08\x01")
+                )
+
+        state_client.write_gatt_char.side_effect = _write_then_burst
+
+        state = await glow.query_state(drain_timeout=0.1)
+
+        assert state.raw_notifications[-1] == b"\x08\x01"
+        assert len(state.raw_notifications) == 3
+
+    async def test_query_state_disconnect_on_success(
+        self, device: Any, state_client: Any
+    ) -> None:
         glow = CasperGlow(device)
 
-        with patch("pycasperglow.device.establish_connection", return_value=client):
+        with patch(
+            "pycasperglow.device.establish_connection", return_value=state_client
+        ):
             await glow.query_state()
 
-        client.disconnect.assert_called_once()
+        state_client.disconnect.assert_called_once()
 
-    async def test_parse_state_on(self) -> None:
-        device = _make_ble_device()
+    async def test_notify_defers_state_parsing(self, device: Any) -> None:
         glow = CasperGlow(device)
+        handler = _NotifyHandler(glow)
 
-        notification = _make_state_notification(
-            is_on=True,
-            dimming_ms=900_000,
-            remaining_ms=900_000,
-        )
-        result = glow._parse_state_notification(notification)
+        handler(None, _make_ready_notification(token=9))
+        handler(None, bytearray(_make_state_notification(is_on=True)))
 
-        assert result is True
+        assert handler.token.result() == 9
+        assert glow.state.is_on is None
+        await handler.state
         assert glow.state.is_on is True
-        assert glow.state.is_paused is False
-        assert glow.state.configured_dimming_time_minutes == 15
-        assert glow.state.dimming_time_remaining_ms == 900_000
-        assert glow.state.dimming_time_minutes == 15
-        assert glow.state.raw_state is not None
 
-    async def test_parse_state_off(self) -> None:
-        device = _make_ble_device()
-        glow = CasperGlow(device)
+    async def test_command_update_follows_notified_state(
+        self, device: Any, make_state_client: Callable[..., Any]
+    ) -> None:
+        # The device answers the write with a stale "off" state; it must
+        # be applied before turn_on()'s optimistic update, not after it.
+        glow = CasperGlow(device, client=make_state_client(is_on=False))
+        states: list[bool | None] = []
+        glow.register_callback(lambda s: states.append(s.is_on))
 
-        notification = _make_state_notification(is_on=False)
-        result = glow._parse_state_notification(notification)
+        await glow.turn_on()
+        await asyncio.sleep(0)
 
-        assert result is True
-        assert glow.state.is_on is False
-        assert glow.state.is_paused is False
-        assert glow.state.dimming_time_remaining_ms == 0
-        assert glow.state.dimming_time_minutes == 0
+        assert glow.state.is_on is True
+        assert states == [True]
 
-    async def test_parse_state_paused(self) -> None:
-        device = _make_ble_device()
+    @pytest.mark.parametrize(
+        ("notification_kwargs", "expected"),
+        [
+            (
+                {"is_on": True, "dimming_ms": 900_000},
+                {
+                    "is_on": True,
+                    "is_paused": False,
+                    "configured_dimming_time_minutes": 15,
+                    "dimming_time_remaining_ms": 900_000,
+                    "dimming_time_minutes": 15,
+                },
+            ),
+            (
+                {"is_on": False},
+                {
+                    "is_on": False,
+                    "is_paused": False,
+                    "dimming_time_remaining_ms": 0,
+                    "dimming_time_minutes": 0,
+                },
+            ),
+            (
+                {"is_on": True, "is_paused": True, "dimming_ms": 900_000},
+                {"is_on": True, "is_paused": True, "dimming_time_minutes": 15},
+            ),
+            # Off but reporting a non-zero remaining time: must be zeroed
+            (
+                {"is_on": False, "dimming_ms": 900_000},
+                {"dimming_time_remaining_ms": 0, "dimming_time_minutes": 0},
+            ),
+            # 10 min remaining in a 15-min sequence
+            (
+                {"is_on": True, "dimming_ms": 900_000, "remaining_ms": 600_000},
+                {
+                    "configured_dimming_time_minutes": 15,
+                    "dimming_time_remaining_ms": 600_000,
+                    "dimming_time_minutes": 10,
+                },
+            ),
+            (
+                {"is_on": True, "dimming_ms": 1_800_000},
+                {"configured_dimming_time_minutes": 30},
+            ),
+            # is_charging reflects sf7 inner field 1
+            ({"is_charging": True}, {"is_charging": True}),
+            ({"is_charging": False}, {"is_charging": False}),
+        ],
+        ids=[
+            "on",
+            "off",
+            "paused",
+            "off_zeros_remaining",
+            "remaining_not_total",
+            "configured_from_ble",
+            "charging",
+            "not_charging",
+        ],
+    )
+    async def test_parse_state(
+        self,
+        device: Any,
+        notification_kwargs: dict[str, Any],
+        expected: dict[str, Any],
+    ) -> None:
         glow = CasperGlow(device)
 
-        notification = _make_state_notification(
-            is_on=True,
-            is_paused=True,
-            dimming_ms=900_000,
-            remaining_ms=900_000,
+        result = glow._parse_state_notification(
+            _make_state_notification(**notification_kwargs)
         )
-        result = glow._parse_state_notification(notification)
 
         assert result is True
-        assert glow.state.is_on is True
-        assert glow.state.is_paused is True
-        assert glow.state.dimming_time_minutes == 15
+        assert glow.state.raw_state is not None
+        assert {name: getattr(glow.state, name) for name in expected} == expected
 
-    async def test_parse_state_no_field_19(self) -> None:
-        device = _make_ble_device()
+    async def test_parse_state_no_field_19(self, device: Any) -> None:
         glow = CasperGlow(device)
 
         # Just a ready marker notification — no field 19
@@ -482,41 +1001,9 @@ class TestCasperGlow:
         assert glow.state.dimming_time_remaining_ms == 0
         assert glow.state.dimming_time_minutes == 0
 
-    async def test_parse_state_notification_off_zeros_dimming_time(self) -> None:
-        device = _make_ble_device()
-        glow = CasperGlow(device)
-        # Device is off but reports a non-zero remaining time — must be zeroed.
-        notification = _make_state_notification(is_on=False, dimming_ms=900_000)
-        glow._parse_state_notification(notification)
-
-        assert glow.state.dimming_time_remaining_ms == 0
-        assert glow.state.dimming_time_minutes == 0
-
-    async def test_parse_state_reports_remaining_not_total(self) -> None:
-        device = _make_ble_device()
-        glow = CasperGlow(device)
-        # 10 min remaining in a 15-min sequence
-        notification = _make_state_notification(
-            is_on=True,
-            dimming_ms=900_000,
-            remaining_ms=600_000,
-        )
-        glow._parse_state_notification(notification)
-
-        assert glow.state.configured_dimming_time_minutes == 15
-        assert glow.state.dimming_time_remaining_ms == 600_000
-        assert glow.state.dimming_time_minutes == 10  # 600_000 ms // 60_000
-
-    async def test_parse_state_configured_set_from_ble(self) -> None:
-        device = _make_ble_device()
-        glow = CasperGlow(device)
-        notification = _make_state_notification(is_on=True, dimming_ms=1_800_000)
-        glow._parse_state_notification(notification)
-
-        assert glow.state.configured_dimming_time_minutes == 30
-
-    async def test_parse_state_off_does_not_corrupt_configured_time(self) -> None:
-        device = _make_ble_device()
+    async def test_parse_state_off_does_not_corrupt_configured_time(
+        self, device: Any
+    ) -> None:
         glow = CasperGlow(device)
         # Establish a known configured time from a previous on-state poll.
         glow._parse_state_notification(
@@ -530,20 +1017,21 @@ class TestCasperGlow:
         assert glow.state.dimming_time_remaining_ms == 0
         assert glow.state.dimming_time_minutes == 0
 
-    @pytest.mark.parametrize(
-        ("is_charging", "expected"),
-        [(True, True), (False, False)],
-        ids=["charging", "not-charging"],
-    )
-    async def test_parse_state_charging(
-        self, is_charging: bool, expected: bool
+    async def test_parse_state_repeated_notification_decoded_once(
+        self, device: Any
     ) -> None:
-        """is_charging reflects sf7 inner field 1 of the state notification."""
-        device = _make_ble_device()
         glow = CasperGlow(device)
-
-        notification = _make_state_notification(is_charging=is_charging)
-        result = glow._parse_state_notification(notification)
-
-        assert result is True
-        assert glow.state.is_charging is expected
+        notification = _make_state_notification(is_on=True, battery=5)
+
+        with patch(
+            "pycasperglow.device.parse_state_response",
+            wraps=parse_state_response,
+        ) as parse:
+            assert glow._parse_state_notification(notification) is True
+            # A local command changes cached state; the repeat must re-apply it
+            glow._state.is_on = False
+            assert glow._parse_state_notification(bytes(notification)) is True
+
+        parse.assert_called_once()
+        assert glow.state.is_on is True
+        assert glow.state.battery_level is BatteryLevel.PCT_75
@@ -2,17 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from pycasperglow.discovery import is_casper_glow
+from pycasperglow.discovery import (
+    default_scan_cache_path,
+    discover_glows,
+    discover_glows_cached,
+    is_casper_glow,
+)
 
 
-def _make_device(name: str | None = None) -> Any:
+def _make_device(name: str | None = None, address: str = "AA:BB:CC:DD:EE:FF") -> Any:
     device = MagicMock()
     device.name = name
+    device.address = address
     return device
 
 
@@ -53,8 +64,9 @@ class TestIsCasperGlow:
             ("SomeOtherDevice", "SomeOtherDevice"),
             (None, None),
             ("Ja", "Ja"),
+            ("", ""),
         ],
-        ids=["different_device", "none_names", "partial_prefix"],
+        ids=["different_device", "none_names", "partial_prefix", "empty_names"],
     )
     def test_no_match(
         self,
@@ -64,3 +76,328 @@ class TestIsCasperGlow:
         device = _make_device(name=device_name)
         adv = _make_adv(local_name=local_name)
         assert not is_casper_glow(device, adv)
+
+    def test_manufacturer_id_alone_does_not_match(self) -> None:
+        device = _make_device(name="Speaker")
+        adv = _make_adv(local_name="Speaker", manufacturer_data={0xFFFF: b"\x01"})
+        assert not is_casper_glow(device, adv)
+
+
+class _FakeScanner:
+    """Stand-in for BleakScanner that replays advertisements on start."""
+
+    def __init__(self, adverts: list[tuple[Any, Any]], **kwargs: Any) -> None:
+        self._adverts = adverts
+        self._callback = kwargs["detection_callback"]
+        self.kwargs = kwargs
+        self.stopped = False
+
+    async def __aenter__(self) -> _FakeScanner:
+        for device, adv in self._adverts:
+            self._callback(device, adv)
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.stopped = True
+
+
+class TestDiscoverGlows:
+    """discover_glows streaming tests."""
+
+    async def test_yields_matching_devices_once(self) -> None:
+        glow = _make_device(name="JarGlow", address="11:22:33:44:55:66")
+        other = _make_device(name="Speaker", address="66:55:44:33:22:11")
+        adverts = [
+            (glow, _make_adv(local_name="JarGlow")),
+            (other, _make_adv(local_name="Speaker")),
+            (glow, _make_adv(local_name="JarGlow")),
+        ]
+        scanners: list[_FakeScanner] = []
+
+        def _factory(**kwargs: Any) -> _FakeScanner:
+            scanner = _FakeScanner(adverts, **kwargs)
+            scanners.append(scanner)
+            return scanner
+
+        with patch("pycasperglow.discovery.BleakScanner", side_effect=_factory):
+            found = [dev async for dev in discover_glows(timeout=0.05)]
+
+        assert found == [glow]
+        assert scanners[0].stopped
+
+    async def test_each_new_device_extends_the_scan(self) -> None:
+        first = _make_device(name="JarOne", address="11:22:33:44:55:66")
+        second = _make_device(name="JarTwo", address="66:55:44:33:22:11")
+
+        class _SlowScanner(_FakeScanner):
+            async def __aenter__(self) -> _FakeScanner:
+                loop = asyncio.get_running_loop()
+                # The second device arrives after the first timeout window
+                for delay, (device, adv) in zip(
+                    (0.15, 0.3), self._adverts, strict=True
+                ):
+                    loop.call_later(delay, self._callback, device, adv)
+                return self
+
+        adverts = [(dev, _make_adv(local_name=dev.name)) for dev in (first, second)]
+        with patch(
+            "pycasperglow.discovery.BleakScanner",
+            side_effect=lambda **kwargs: _SlowScanner(adverts, **kwargs),
+        ):
+            found = [dev async for dev in discover_glows(timeout=0.2)]
+
+        assert found == [first, second]
+
+    async def test_uses_active_scan_without_uuid_filter(self) -> None:
+        scanners: list[_FakeScanner] = []
+
+        def _factory(**kwargs: Any) -> _FakeScanner:
+            scanner = _FakeScanner([], **kwargs)
+            scanners.append(scanner)
+            return scanner
+
+        with patch("pycasperglow.discovery.BleakScanner", side_effect=_factory):
+            assert [dev async for dev in discover_glows(timeout=0.01)] == []
+
+        assert scanners[0].kwargs["scanning_mode"] == "active"
+        assert "service_uuids" not in scanners[0].kwargs
+
+
+def _write_cache(path: Path, entries: list[dict[str, Any]]) -> None:
+    path.write_text(json.dumps(entries))
+
+
+def _advertising(*devices: Any) -> tuple[Any, list[_FakeScanner]]:
+    """Patch BleakScanner with *devices* in range; return the patch and scanners."""
+    scanners: list[_FakeScanner] = []
+
+    def _factory(**kwargs: Any) -> _FakeScanner:
+        adverts = [(device, _make_adv(local_name=device.name)) for device in devices]
+        scanner = _FakeScanner(adverts, **kwargs)
+        scanners.append(scanner)
+        return scanner
+
+    return patch("pycasperglow.discovery.BleakScanner", side_effect=_factory), scanners
+
+
+async def _no_devices(timeout: float) -> Any:
+    return
+    yield
+
+
+class TestDiscoverGlowsCached:
+    """discover_glows_cached tests."""
+
+    async def test_fresh_cache_skips_scan(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": time.time()}],
+        )
+        device = _make_device(name="Jar", address="11:22:33:44:55:66")
+        advertising, scanners = _advertising(device)
+
+        with advertising, patch("pycasperglow.discovery.discover_glows") as scan:
+            found = [dev async for dev in discover_glows_cached(cache_path=cache)]
+
+        assert found == [device]
+        assert len(scanners) == 1
+        assert scanners[0].stopped
+        scan.assert_not_called()
+
+    async def test_stale_cache_rescans_and_rewrites(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": 0.0}],
+        )
+        device = _make_device(name="JarNew", address="AA:BB:CC:DD:EE:FF")
+        advertising, scanners = _advertising()
+
+        async def _scan(timeout: float) -> Any:
+            yield device
+
+        with advertising, patch("pycasperglow.discovery.discover_glows", _scan):
+            found = [dev async for dev in discover_glows_cached(cache_path=cache)]
+
+        assert found == [device]
+        assert scanners == []
+        saved = json.loads(cache.read_text())
+        assert [(e["address"], e["name"]) for e in saved] == [
+            ("AA:BB:CC:DD:EE:FF", "JarNew")
+        ]
+
+    async def test_unresolved_cache_falls_back_to_scan(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": time.time()}],
+        )
+        device = _make_device(name="Jar", address="AA:BB:CC:DD:EE:FF")
+        advertising, _ = _advertising()
+
+        async def _scan(timeout: float) -> Any:
+            yield device
+
+        with (
+            advertising,
+            patch("pycasperglow.discovery._CACHED_LOOKUP_TIMEOUT", 0.01),
+            patch("pycasperglow.discovery.discover_glows", _scan),
+        ):
+            found = [dev async for dev in discover_glows_cached(cache_path=cache)]
+
+        assert found == [device]
+
+    async def test_zero_ttl_ignores_cache(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": time.time()}],
+        )
+        advertising, scanners = _advertising()
+
+        with advertising, patch("pycasperglow.discovery.discover_glows", _no_devices):
+            found = [
+                dev
+                async for dev in discover_glows_cached(cache_ttl=0, cache_path=cache)
+            ]
+
+        assert found == []
+        assert scanners == []
+        assert json.loads(cache.read_text()) == []
+
+    @pytest.mark.parametrize(
+        "contents",
+        ["not json", '{"address": "x"}', '[{"address": 1, "timestamp": "now"}]'],
+        ids=["invalid_json", "not_a_list", "bad_entry"],
+    )
+    async def test_malformed_cache_treated_as_empty(
+        self, tmp_path: Path, contents: str
+    ) -> None:
+        cache = tmp_path / "scan.json"
+        cache.write_text(contents)
+
+        with patch("pycasperglow.discovery.discover_glows", _no_devices):
+            found = [dev async for dev in discover_glows_cached(cache_path=cache)]
+
+        assert found == []
+
+    async def test_cached_address_must_still_be_a_glow(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": time.time()}],
+        )
+        # A planted entry: the address now belongs to some other device
+        other = _make_device(name="Speaker", address="11:22:33:44:55:66")
+        advertising, _ = _advertising(other)
+
+        with (
+            advertising,
+            patch("pycasperglow.discovery._CACHED_LOOKUP_TIMEOUT", 0.01),
+            patch("pycasperglow.discovery.discover_glows", _no_devices),
+        ):
+            found = [dev async for dev in discover_glows_cached(cache_path=cache)]
+
+        assert found == []
+
+    async def test_one_short_scan_for_all_cached_devices(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        now = time.time()
+        _write_cache(
+            cache,
+            [
+                {"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": now},
+                {"address": "AA:BB:CC:DD:EE:FF", "name": "Jar", "timestamp": now},
+            ],
+        )
+        device = _make_device(name="Jar", address="aa:bb:cc:dd:ee:ff")
+        advertising, scanners = _advertising(device)
+
+        # The powered-off light only costs the short lookup deadline
+        with (
+            advertising,
+            patch("pycasperglow.discovery._CACHED_LOOKUP_TIMEOUT", 0.05),
+            patch("pycasperglow.discovery.discover_glows") as scan,
+        ):
+            found = await asyncio.wait_for(
+                _collect(discover_glows_cached(timeout=60.0, cache_path=cache)), 1.0
+            )
+
+        assert found == [device]
+        assert len(scanners) == 1
+        scan.assert_not_called()
+        saved = json.loads(cache.read_text())
+        assert [e["address"] for e in saved] == ["AA:BB:CC:DD:EE:FF"]
+
+    async def test_lookup_ends_once_every_cached_device_is_seen(
+        self, tmp_path: Path
+    ) -> None:
+        cache = tmp_path / "scan.json"
+        _write_cache(
+            cache,
+            [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": time.time()}],
+        )
+        device = _make_device(name="Jar", address="11:22:33:44:55:66")
+        advertising, _ = _advertising(device)
+
+        with advertising, patch("pycasperglow.discovery._CACHED_LOOKUP_TIMEOUT", 60):
+            found = await asyncio.wait_for(
+                _collect(discover_glows_cached(timeout=60.0, cache_path=cache)), 1.0
+            )
+
+        assert found == [device]
+
+    async def test_early_exit_keeps_cache(self, tmp_path: Path) -> None:
+        cache = tmp_path / "scan.json"
+        entries = [{"address": "11:22:33:44:55:66", "name": "Jar", "timestamp": 0.0}]
+        _write_cache(cache, entries)
+
+        async def _scan(timeout: float) -> Any:
+            yield _make_device(name="Jar", address="AA:BB:CC:DD:EE:FF")
+            yield _make_device(name="Jar", address="AA:BB:CC:DD:EE:00")
+
+        with patch("pycasperglow.discovery.discover_glows", _scan):
+            found: Any = discover_glows_cached(cache_path=cache)
+            await anext(found)
+            await found.aclose()
+
+        assert json.loads(cache.read_text()) == entries
+
+    async def test_save_replaces_planted_symlink(self, tmp_path: Path) -> None:
+        victim = tmp_path / "victim"
+        victim.write_text("keep")
+        cache = tmp_path / "scan.json"
+        cache.symlink_to(victim)
+
+        async def _scan(timeout: float) -> Any:
+            yield _make_device(name="Jar")
+
+        with patch("pycasperglow.discovery.discover_glows", _scan):
+            [dev async for dev in discover_glows_cached(cache_ttl=0, cache_path=cache)]
+
+        assert victim.read_text() == "keep"
+        assert not cache.is_symlink()
+        assert json.loads(cache.read_text())[0]["address"] == "AA:BB:CC:DD:EE:FF"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["scan.json", "victim"]
+
+
+async def _collect(devices: AsyncIterator[Any]) -> list[Any]:
+    return [device async for device in devices]
+
+
+class TestDefaultScanCachePath:
+    """default_scan_cache_path tests."""
+
+    def test_prefers_runtime_dir(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        assert default_scan_cache_path() == tmp_path / "pycasperglow_scan.json"
+
+    def test_falls_back_to_user_cache_dir(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_scan_cache_path() == tmp_path / "pycasperglow" / "scan.json"
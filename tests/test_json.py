@@ -0,0 +1,37 @@
+"""Tests for the optional-orjson JSON helpers."""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from collections.abc import Iterator
+from types import ModuleType
+from unittest.mock import patch
+
+import pytest
+
+import pycasperglow._json
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def json_module(request: pytest.FixtureRequest) -> Iterator[ModuleType]:
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        yield importlib.reload(pycasperglow._json)
+    else:
+        with patch.dict(sys.modules, {"orjson": None}):
+            yield importlib.reload(pycasperglow._json)
+    importlib.reload(pycasperglow._json)
+
+
+def test_round_trip(json_module: ModuleType) -> None:
+    obj = [{"address": "AA:BB", "name": None, "timestamp": 1.5}]
+    encoded = json_module.dumps(obj)
+    assert isinstance(encoded, bytes)
+    assert encoded == b'[{"address":"AA:BB","name":null,"timestamp":1.5}]'
+    assert json_module.loads(encoded) == obj
+
+
+def test_invalid_raises_value_error(json_module: ModuleType) -> None:
+    with pytest.raises(ValueError):
+        json_module.loads(b"not json")
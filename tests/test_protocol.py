@@ -1,13 +1,20 @@
 """Tests for protocol encoding/decoding functions."""
 
+from unittest.mock import patch
+
 import pytest
 
-from pycasperglow.const import ACTION_BODY_OFF, ACTION_BODY_ON
+from pycasperglow.const import ACTION_BODY_OFF, ACTION_BODY_ON, DIMMING_TIME_MINUTES
 from pycasperglow.protocol import (
+    STATE_RESPONSE_FIELD,
+    _try_parse_varint,
+    action_packet_template,
     build_action_packet,
     build_brightness_body,
     encode_varint,
+    extract_ready_token,
     extract_token_from_notify,
+    parse_protobuf_field_items,
     parse_protobuf_fields,
     parse_state_response,
     parse_varint,
@@ -26,7 +33,13 @@ class TestVarint:
             (127, b"\x7f"),
             (128, b"\x80\x01"),
             (300, b"\xac\x02"),
+            (16383, b"\xff\x7f"),
             (16384, b"\x80\x80\x01"),
+            (2**21 - 1, b"\xff\xff\x7f"),
+            (2**21, b"\x80\x80\x80\x01"),
+            (2**28 - 1, b"\xff\xff\xff\x7f"),
+            (2**28, b"\x80\x80\x80\x80\x01"),
+            (2**63, b"\x80" * 9 + b"\x01"),
         ],
     )
     def test_encode(self, value: int, expected: bytes) -> None:
@@ -40,6 +53,9 @@ class TestVarint:
             (b"\x7f", 127, 1),
             (b"\x80\x01", 128, 2),
             (b"\xac\x02", 300, 2),
+            (b"\xff\x7f", 16383, 2),
+            (b"\x80\x80\x01", 16384, 3),
+            (b"\xac\x02\x08", 300, 2),
         ],
     )
     def test_parse(self, data: bytes, expected_value: int, expected_pos: int) -> None:
@@ -47,6 +63,9 @@ class TestVarint:
         assert value == expected_value
         assert pos == expected_pos
 
+    def test_encode_single_byte_is_shared(self) -> None:
+        assert encode_varint(42) is encode_varint(42)
+
     def test_roundtrip(self) -> None:
         for v in [0, 1, 127, 128, 255, 300, 100000]:
             encoded = encode_varint(v)
@@ -59,10 +78,31 @@ class TestVarint:
         assert value == 150
         assert pos == 4
 
+    def test_parse_single_byte_with_offset(self) -> None:
+        data = b"\x96\x01\x2a"  # multi-byte varint, then single-byte 42
+        assert parse_varint(data, start=2) == (42, 3)
+
     def test_parse_truncated(self) -> None:
         with pytest.raises(ValueError, match="Truncated"):
             parse_varint(b"\x80")  # continuation bit set but no next byte
 
+    def test_parse_truncated_two_byte(self) -> None:
+        with pytest.raises(ValueError, match="Truncated"):
+            parse_varint(b"\x08\x80\x80", start=1)
+
+    def test_parse_start_past_end(self) -> None:
+        with pytest.raises(ValueError, match="Truncated"):
+            parse_varint(b"\x08", start=1)
+
+    @pytest.mark.parametrize("data", [b"", b"\x80", b"\x80\x80", b"\xff" * 5])
+    def test_try_parse_truncated_returns_none(self, data: bytes) -> None:
+        assert _try_parse_varint(data, 0) is None
+
+    def test_try_parse_matches_parse(self) -> None:
+        data = b"\x2a\x96\x01\x80\x80\x01"
+        for start in (0, 1, 3):
+            assert _try_parse_varint(data, start) == parse_varint(data, start)
+
     def test_parse_empty(self) -> None:
         with pytest.raises(ValueError, match="Truncated"):
             parse_varint(b"")
@@ -109,6 +149,45 @@ class TestTokenExtraction:
         token = extract_token_from_notify(payload)
         assert token == 150
 
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            b"\x10\x05\x08\x2a",
+            b"\x22\x02\x08\x07\x08\x2a",
+            b"\x0a\x01\x00\x08\x2a",
+        ],
+        ids=["after_varint", "after_length_delimited", "after_bytes_field_1"],
+    )
+    def test_token_not_first(self, payload: bytes) -> None:
+        assert extract_token_from_notify(payload) == 42
+
+    @pytest.mark.parametrize(
+        ("payload", "parsed"),
+        [
+            (b"\x08\x96\x01\x72\x02\x08\x00", False),
+            (b"\x72\x02\x08\x00\x08\x96\x01", True),
+            (b"\x10\x05\x08\x96\x01\x72\x02\x08\x00", True),
+        ],
+        ids=["token_first", "marker_first", "other_field_first"],
+    )
+    def test_leading_token_fast_path(self, payload: bytes, parsed: bool) -> None:
+        # Only a payload that starts with field 1 skips the generic parser;
+        # any other field order must still find the token.
+        with patch(
+            "pycasperglow.protocol.parse_protobuf_fields", wraps=parse_protobuf_fields
+        ) as parse:
+            assert extract_ready_token(payload) == 150
+
+        assert parse.called is parsed
+
+    @pytest.mark.parametrize(
+        "payload",
+        [b"\x10\x05\x0b\x08\x2a", b"\x22\x09\x08\x2a", b"\x10\x80"],
+        ids=["unknown_wire_type", "overlong_length", "truncated_before_token"],
+    )
+    def test_malformed_before_token(self, payload: bytes) -> None:
+        assert extract_token_from_notify(payload) is None
+
     def test_no_field_1(self) -> None:
         # Field 2 (tag=0x10) only
         payload = b"\x10\x05"
@@ -121,6 +200,20 @@ class TestTokenExtraction:
         assert extract_token_from_notify(b"\x08\x80") is None
 
 
+class TestExtractReadyToken:
+    """Combined ready-marker and token extraction tests."""
+
+    def test_ready_notification(self) -> None:
+        payload = b"\x08\x96\x01" + bytes.fromhex("72020800")
+        assert extract_ready_token(payload) == 150
+
+    def test_token_without_marker(self) -> None:
+        assert extract_ready_token(b"\x08\x2a") is None
+
+    def test_marker_without_token(self) -> None:
+        assert extract_ready_token(bytes.fromhex("72020800")) is None
+
+
 class TestBuildActionPacket:
     """Action packet building tests."""
 
@@ -138,6 +231,28 @@ class TestBuildActionPacket:
         # field1=0x08 0x01, field2=0x10 + varint(300)=\xac\x02
         assert packet[:5] == b"\x08\x01\x10\xac\x02"
 
+    def test_long_body(self) -> None:
+        body = b"\x00" * 200
+        packet = build_action_packet(42, body)
+        assert packet == b"\x08\x01\x10\x2a\x22\xc8\x01" + body
+
+    def test_negative_token_raises(self) -> None:
+        with pytest.raises(ValueError, match="non-negative"):
+            build_action_packet(-1, ACTION_BODY_ON)
+
+
+class TestActionPacketTemplate:
+    """Precompiled action packet builder tests."""
+
+    @pytest.mark.parametrize("token", [0, 42, 127, 128, 300, 2**32])
+    @pytest.mark.parametrize("body", [ACTION_BODY_ON, ACTION_BODY_OFF, b""])
+    def test_matches_build_action_packet(self, body: bytes, token: int) -> None:
+        assert action_packet_template(body)(token) == build_action_packet(token, body)
+
+    def test_repeated_token_reuses_packet(self) -> None:
+        build = action_packet_template(ACTION_BODY_ON)
+        assert build(300) is build(300)
+
 
 class TestParseProtobufFields:
     """Generic protobuf field parser tests."""
@@ -175,6 +290,14 @@ class TestParseProtobufFields:
         fields = parse_protobuf_fields(data)
         assert fields == {1: [1, 2]}
 
+    def test_plain_dict_of_lists(self) -> None:
+        # Callers index missing fields and expect a list even for one value
+        fields = parse_protobuf_fields(b"\x08\x01\x10\x05")
+        assert type(fields) is dict
+        assert all(type(values) is list for values in fields.values())
+        with pytest.raises(KeyError):
+            fields[3]
+
     def test_empty_payload(self) -> None:
         assert parse_protobuf_fields(b"") == {}
 
@@ -183,6 +306,16 @@ class TestParseProtobufFields:
         fields = parse_protobuf_fields(b"\x08\x80")
         assert fields == {}
 
+    def test_multi_byte_values(self) -> None:
+        # field 1 = token 141297904, field 3 = two-byte length-delimited body
+        body = b"\x00" * 130
+        data = b"\x08\xf0\x91\xb0\x43\x1a\x82\x01" + body + b"\x20\x01"
+        assert parse_protobuf_fields(data) == {1: [141297904], 3: [body], 4: [1]}
+
+    def test_truncated_multi_byte_varint(self) -> None:
+        fields = parse_protobuf_fields(b"\x08\x01\x10\xf0\x91")
+        assert fields == {1: [1]}
+
     def test_truncated_length_delimited(self) -> None:
         # field 4, claims 10 bytes but only 2 available
         data = b"\x22\x0a\xab\xcd"
@@ -197,13 +330,36 @@ class TestParseProtobufFields:
         assert fields[14] == [b"\x08\x00"]
 
 
+class TestParseProtobufFieldItems:
+    """Memoised, immutable field parser tests."""
+
+    def test_sorted_tuple_items(self) -> None:
+        data = b"\x72\x02\x08\x00\x08\x01\x08\x02"
+        assert parse_protobuf_field_items(data) == (
+            (1, (1, 2)),
+            (14, (b"\x08\x00",)),
+        )
+
+    def test_matches_dict_parser(self) -> None:
+        data = b"\x08\x96\x01" + bytes.fromhex("72020800")
+        assert dict(parse_protobuf_field_items(data)) == {
+            k: tuple(v) for k, v in parse_protobuf_fields(data).items()
+        }
+
+    def test_repeated_payload_is_cached(self) -> None:
+        data = b"\x08\x2a\x10\x07"
+        first = parse_protobuf_field_items(data)
+        assert parse_protobuf_field_items(bytes(data)) is first
+
+    def test_malformed_payload(self) -> None:
+        assert parse_protobuf_field_items(b"\x08\x80") == ()
+
+
 class TestParseStateResponse:
     """State response parsing tests."""
 
     def _make_state_notification(self, state_body: bytes, token: int = 42) -> bytes:
         """Build a notification with field 1 (token) and field 4 wrapping field 19."""
-        from pycasperglow.protocol import STATE_RESPONSE_FIELD
-
         tag_19 = (STATE_RESPONSE_FIELD << 3) | 2  # wire type 2
         field4_body = (
             encode_varint(tag_19) + encode_varint(len(state_body)) + state_body
@@ -274,12 +430,14 @@ class TestParseStateResponse:
         assert parse_state_response(notification) is None
 
     @pytest.mark.parametrize(
-        ("raw_hex", "expected_fields"),
+        ("raw", "expected_fields"),
         [
             (
-                "08f091b04310011891a0e78c01"
-                "22179a01140803100018002000"
-                "280030003a04080010064064",
+                bytes.fromhex(
+                    "08f091b04310011891a0e78c01"
+                    "22179a01140803100018002000"
+                    "280030003a04080010064064"
+                ),
                 {
                     1: [3],
                     3: [0],
@@ -288,10 +446,12 @@ class TestParseStateResponse:
                 },  # off, full battery
             ),
             (
-                "08c392b043100118aac89c15"
-                "221b9a0118080110dbc20418"
-                "a0f7362000280030003a0408"
-                "0310064064",
+                bytes.fromhex(
+                    "08c392b043100118aac89c15"
+                    "221b9a0118080110dbc20418"
+                    "a0f7362000280030003a0408"
+                    "0310064064"
+                ),
                 {
                     1: [1],
                     3: [900000],
@@ -301,10 +461,12 @@ class TestParseStateResponse:
                 },  # on, full battery
             ),
             (
-                "08f091b0431001189fb7e0cd07"
-                "221b9a01180801109cba0a18"
-                "a0f7362001280030003a0408"
-                "0010064064",
+                bytes.fromhex(
+                    "08f091b0431001189fb7e0cd07"
+                    "221b9a01180801109cba0a18"
+                    "a0f7362001280030003a0408"
+                    "0010064064"
+                ),
                 {
                     1: [1],
                     3: [900000],
@@ -314,9 +476,11 @@ class TestParseStateResponse:
                 },  # paused, full battery
             ),
             (
-                "08f091b043100118ecc8f89808"
-                "22179a01140803100018002000"
-                "280030003a04080010034064",
+                bytes.fromhex(
+                    "08f091b043100118ecc8f89808"
+                    "22179a01140803100018002000"
+                    "280030003a04080010034064"
+                ),
                 {
                     1: [3],
                     7: [b"\x08\x00\x10\x03"],
@@ -324,7 +488,9 @@ class TestParseStateResponse:
                 },  # off, low battery (level 3)
             ),
             (
-                "08f091b043100118baf8ed800622179a01140803100018002000280030003a04080010054064",
+                bytes.fromhex(
+                    "08f091b043100118baf8ed800622179a01140803100018002000280030003a04080010054064"
+                ),
                 {
                     1: [3],
                     5: [0],
@@ -333,7 +499,9 @@ class TestParseStateResponse:
                 },  # off, 75% battery, not charging
             ),
             (
-                "08c392b0431001189ef1c3e80222179a01140803100018002000280030003a04080310064064",
+                bytes.fromhex(
+                    "08c392b0431001189ef1c3e80222179a01140803100018002000280030003a04080310064064"
+                ),
                 {
                     1: [3],
                     5: [0],  # sf5 always 0, even when charging
@@ -353,10 +521,10 @@ class TestParseStateResponse:
         ],
     )
     def test_real_device_notification(
-        self, raw_hex: str, expected_fields: dict[int, list[int | bytes]]
+        self, raw: bytes, expected_fields: dict[int, list[int | bytes]]
     ) -> None:
         """Parse actual notifications captured from a real Glow device."""
-        result = parse_state_response(bytes.fromhex(raw_hex))
+        result = parse_state_response(raw)
         assert result is not None
         for field, value in expected_fields.items():
             assert result[field] == value
@@ -403,6 +571,31 @@ class TestParseStateResponse:
         assert result is not None
         assert result[7] == [expected_sf7]
 
+    @pytest.mark.parametrize(
+        "notification",
+        [
+            b"\x22\x03\x9a\x01\x00",  # empty state body
+            b"\x22\x02\x08\x01",  # field 4 without field 19
+            b"\x20\x05",  # field 4 as a varint
+            b"\x22\x03\x9a\x01\x00\x20\x05",  # varint field 4 replaces it
+            b"\x22\x05\x9a\x01\x02\x08\x01\x08\x80",  # truncated trailer
+            b"\x22\x05\x9a\x01\x02\x08\x01\x0b",  # unknown wire type
+            b"\x22\x09\x9a\x01\x01\x00\x9a\x01\x02\x08\x05",  # repeated 19
+            b"\x22\x03\x9a\x01\x00\x22\x02\x08\x01",  # repeated 4, no 19
+            b"\x22\x05\x9a\x01",  # field 4 length past the end
+            b"\x22\x86\x01\x9a\x01\x82\x01" + b"\x08\x01" * 64 + b"\x10\x07",
+        ],
+    )
+    def test_matches_full_field_parse(self, notification: bytes) -> None:
+        top = parse_protobuf_fields(notification).get(4)
+        expected = None
+        if top and isinstance(top[-1], bytes):
+            inner = parse_protobuf_fields(top[-1]).get(19)
+            if inner and isinstance(inner[-1], bytes):
+                expected = parse_protobuf_fields(inner[-1])
+
+        assert parse_state_response(notification) == expected
+
 
 class TestBuildBrightnessBody:
     """Brightness body construction tests.
@@ -411,19 +604,19 @@ class TestBuildBrightnessBody:
     """
 
     @pytest.mark.parametrize(
-        ("pct", "expected_hex"),
+        ("pct", "expected"),
         [
-            (60, "920106103c18a0f736"),
-            (70, "920106104618a0f736"),
-            (80, "920106105018a0f736"),
-            (90, "920106105a18a0f736"),
-            (100, "920106106418a0f736"),
+            (60, bytes.fromhex("920106103c18a0f736")),
+            (70, bytes.fromhex("920106104618a0f736")),
+            (80, bytes.fromhex("920106105018a0f736")),
+            (90, bytes.fromhex("920106105a18a0f736")),
+            (100, bytes.fromhex("920106106418a0f736")),
         ],
     )
-    def test_brightness_15min(self, pct: int, expected_hex: str) -> None:
+    def test_brightness_15min(self, pct: int, expected: bytes) -> None:
         """Exact byte output verified against iOS app BLE captures; dimming=15 min."""
         body = build_brightness_body(pct, 900_000)
-        assert body == bytes.fromhex(expected_hex)
+        assert body == expected
         outer = parse_protobuf_fields(body)[18][0]
         assert isinstance(outer, bytes)
         inner_fields = parse_protobuf_fields(outer)
@@ -434,10 +627,24 @@ class TestBuildBrightnessBody:
         body = build_brightness_body(100, 1_800_000)
         # 1800000 ms as varint
         expected_inner = b"\x10\x64" + b"\x18" + encode_varint(1_800_000)
-        tag = bytes.fromhex("9201")
-        expected = tag + encode_varint(len(expected_inner)) + expected_inner
+        expected = b"\x92\x01" + encode_varint(len(expected_inner)) + expected_inner
         assert body == expected
 
+    @pytest.mark.parametrize("minutes", [*DIMMING_TIME_MINUTES, 1, 120])
+    def test_dimming_times(self, minutes: int) -> None:
+        ms = minutes * 60_000
+        inner = b"\x10\x50\x18" + encode_varint(ms)
+        expected = b"\x92\x01" + encode_varint(len(inner)) + inner
+        assert build_brightness_body(80, ms) == expected
+
+    def test_repeated_call_is_cached(self) -> None:
+        assert build_brightness_body(70, 900_000) is build_brightness_body(70, 900_000)
+
+    def test_multi_byte_brightness(self) -> None:
+        body = build_brightness_body(200, 60_000)
+        inner = b"\x10" + encode_varint(200) + b"\x18" + encode_varint(60_000)
+        assert body == bytes.fromhex("9201") + encode_varint(len(inner)) + inner
+
     def test_body_parseable_by_protobuf_parser(self) -> None:
         """The brightness body is well-formed length-delimited protobuf."""
         body = build_brightness_body(90, 900_000)